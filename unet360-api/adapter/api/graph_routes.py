@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from core.services.graph_service import GraphService
+from core.services.graph_refresh_scheduler import GraphRefreshScheduler
 from core.ports.graph_service_port import GraphServicePort
-from adapter.external.graph_adapter import NetworkXGraphService
+from adapter.external.graph_engine import get_graph_engine
 from adapter.database.node_repository import NodeRepository
 from core.dtos.responses_dto import GeneralResponse
-from core.exceptions.graph_exceptions import NodeNotFoundError, NoPathError
+from core.dtos.graph_dto import BatchShortestPathDTO
+from core.exceptions.graph_exceptions import GraphException, NodeNotFoundError, NoPathError, NoTaggedNodeError
 
 router = APIRouter(prefix="/graph", tags=["Graph"])
 
@@ -14,30 +19,102 @@ def get_node_repository() -> NodeRepository:
 
 def get_graph_adapter(node_repo: NodeRepository = Depends(get_node_repository)) -> GraphServicePort:
     """Devuelve el adaptador concreto"""
-    return NetworkXGraphService(node_repo)
+    return get_graph_engine(node_repo)
 
 def get_graph_service(adapter: GraphServicePort = Depends(get_graph_adapter)) -> GraphService:
     """Envuelve el adaptador en el servicio de negocio"""
     return GraphService(adapter)
 
-@router.on_event("startup")
-async def startup_event():
-    """Evento de inicio para inicializar el servicio de grafo"""
-    node_repo = NodeRepository()
-    graph_service = NetworkXGraphService(node_repo)
-    await graph_service.refresh_graph()
+def get_refresh_scheduler(adapter: GraphServicePort = Depends(get_graph_adapter)) -> GraphRefreshScheduler:
+    """Devuelve el planificador de refrescos del grafo"""
+    return GraphRefreshScheduler(adapter)
 
 @router.get("/shortest-path/{source}/{target}", response_model=GeneralResponse)
-async def get_shortest_path(source: str, target: str, graph_service: GraphService = Depends(get_graph_service)):
-    """Obtiene el camino más corto entre dos nodos."""
+async def get_shortest_path(
+    source: str,
+    target: str,
+    k: int = Query(1, ge=1, le=10, description="Number of loopless alternative routes to return"),
+    hops: bool = Query(False, description="Include per-hop viewer data (heading, rotation correction, tiles)"),
+    graph_service: GraphService = Depends(get_graph_service),
+):
+    """Obtiene el camino más corto entre dos nodos y, con `k` > 1, hasta k rutas alternativas.
+
+    Con `hops` cada ruta incluye los datos del visor de cada salto.
+    """
+    def route_obj(path):
+        obj = {"path": path.nodes, "total_weight": path.total_weight}
+        if hops:
+            obj["hops"] = [hop.model_dump() for hop in graph_service.describe_route(path)]
+        return obj
+
+    try:
+        if k == 1:
+            path = await graph_service.calculate_shortest_path(source, target)
+            return GeneralResponse(
+                http_code=200,
+                status=True,
+                response_obj=route_obj(path)
+            )
+        paths = await graph_service.calculate_k_shortest_paths(source, target, k)
+        routes = [route_obj(path) for path in paths]
+        return GeneralResponse(
+            http_code=200,
+            status=True,
+            response_obj={**routes[0], "routes": routes}
+        )
+    except NodeNotFoundError as e:
+        return GeneralResponse(
+            http_code=404,
+            status=False,
+            response_obj={"message": str(e)}
+        )
+    except NoPathError as e:
+        return GeneralResponse(
+            http_code=404,
+            status=False,
+            response_obj={"message": str(e)}
+        )
+
+@router.post("/shortest-paths")
+async def get_shortest_paths(data: BatchShortestPathDTO, graph_service: GraphService = Depends(get_graph_service)):
+    """Calcula en lote los caminos más cortos de varios pares (o de un origen a varios destinos).
+
+    Los pares se agrupan por origen y la respuesta se envía como NDJSON: una línea por
+    par, en cuanto se resuelve el grupo de su origen.
+    """
+    async def stream():
+        pairs = ((pair.source, pair.target) for pair in data.all_pairs())
+        async for source, target, result in graph_service.calculate_shortest_paths(pairs):
+            if isinstance(result, GraphException):
+                line = {"source": source, "target": target, "status": False, "message": str(result)}
+            else:
+                line = {
+                    "source": source,
+                    "target": target,
+                    "status": True,
+                    "path": result.nodes,
+                    "total_weight": result.total_weight
+                }
+            yield json.dumps(line) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.get("/distances/{source}", response_model=GeneralResponse)
+async def get_distances(
+    source: str,
+    max_weight: Optional[float] = Query(None, ge=0, description="Only return nodes within this total weight"),
+    graph_service: GraphService = Depends(get_graph_service),
+):
+    """Obtiene la distancia desde un nodo a todos los alcanzables (isócrona si se indica `max_weight`)."""
     try:
-        path = await graph_service.calculate_shortest_path(source, target)
+        distances = await graph_service.calculate_distances(source, max_weight)
         return GeneralResponse(
             http_code=200,
             status=True,
             response_obj={
-                "path": path.nodes,
-                "total_weight": path.total_weight
+                "source": source,
+                "max_weight": max_weight,
+                "distances": dict(distances)
             }
         )
     except NodeNotFoundError as e:
@@ -46,7 +123,31 @@ async def get_shortest_path(source: str, target: str, graph_service: GraphServic
             status=False,
             response_obj={"message": str(e)}
         )
-    except NoPathError as e:
+
+@router.get("/nearest/{source}", response_model=GeneralResponse)
+async def get_nearest_tagged(
+    source: str,
+    tag: str = Query(..., description="Tag name the destination must carry"),
+    value: Optional[str] = Query(None, description="Optional tag value the destination must carry"),
+    limit: int = Query(1, ge=1, le=50, description="Maximum number of nearest destinations"),
+    graph_service: GraphService = Depends(get_graph_service),
+):
+    """Obtiene los nodos más cercanos con un tag (y valor) con una única búsqueda desde el origen."""
+    try:
+        paths = await graph_service.find_nearest_tagged(source, tag, value, limit)
+        return GeneralResponse(
+            http_code=200,
+            status=True,
+            response_obj=[
+                {
+                    "node": path.nodes[-1],
+                    "path": path.nodes,
+                    "total_weight": path.total_weight
+                }
+                for path in paths
+            ]
+        )
+    except (NodeNotFoundError, NoTaggedNodeError) as e:
         return GeneralResponse(
             http_code=404,
             status=False,
@@ -54,13 +155,35 @@ async def get_shortest_path(source: str, target: str, graph_service: GraphServic
         )
 
 @router.post("/refresh", response_model=GeneralResponse)
-async def refresh_graph(graph_service: GraphService = Depends(get_graph_service)):
+async def refresh_graph(scheduler: GraphRefreshScheduler = Depends(get_refresh_scheduler)):
     """Refresca el grafo cargando los nodos y aristas desde la base de datos."""
-    await graph_service.refresh_graph()
+    await scheduler.refresh(wait=True)
+    return GeneralResponse(
+        http_code=200,
+        status=True,
+        response_obj={"message": "Graph refreshed successfully", "version": scheduler.last_version}
+    )
+
+@router.get("/status", response_model=GeneralResponse)
+async def get_graph_status(
+    scheduler: GraphRefreshScheduler = Depends(get_refresh_scheduler),
+    adapter: GraphServicePort = Depends(get_graph_adapter),
+):
+    """Devuelve la versión del grafo publicado, los datos del último refresco y los contadores de caché."""
+    return GeneralResponse(
+        http_code=200,
+        status=True,
+        response_obj={**scheduler.status(), "caches": adapter.get_cache_stats()}
+    )
+
+@router.get("/analytics", response_model=GeneralResponse)
+async def get_graph_analytics(graph_service: GraphService = Depends(get_graph_service)):
+    """Devuelve los puentes, puntos de articulación y tamaños de componente del grafo publicado."""
+    analytics = await graph_service.get_graph_analytics()
     return GeneralResponse(
         http_code=200,
         status=True,
-        response_obj={"message": "Graph refreshed successfully"}
+        response_obj=analytics.dict()
     )
 
 @router.get("/nodes", response_model=GeneralResponse)
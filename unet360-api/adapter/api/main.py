@@ -10,9 +10,14 @@ from adapter.api.node_routes import router as node_router
 from adapter.api.tag_routes import router as tag_router
 from adapter.api.tenant_routes import router as tenant_router
 from adapter.api.upload_routes import router as upload_router
+from adapter.database.node_repository import NodeRepository
+from adapter.external.graph_engine import get_graph_engine
 from adapter.external.supabase_adapter import create_supabase_client
 from beanie import init_beanie
 from core.dtos.responses_dto import GeneralResponse
+from core.services.graph_refresh_scheduler import GraphRefreshScheduler
+from core.services.node_search_index import NodeSearchIndex
+from core.services.catalog_cache import CatalogCache
 from core.entities.location_model import Location
 from core.entities.node_model import Node
 from core.entities.tag_model import Tag
@@ -33,6 +38,7 @@ logger.setLevel(logging.DEBUG)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     client = None
+    graph_scheduler = None
 
     try:
         # Initialize internal bucket (images)
@@ -57,12 +63,30 @@ async def lifespan(app: FastAPI):
             database=database, document_models=[Location, Tag, Node, Tenant]
         )
 
+        # Initialize routing graph; the scheduler coalesces refreshes and runs the periodic full reconcile
+        graph_scheduler = GraphRefreshScheduler(get_graph_engine(NodeRepository()))
+        await graph_scheduler.start()
+
+        # Initialize tag/location catalog cache; if it fails here, the first lookup loads it
+        try:
+            await CatalogCache().load()
+        except Exception:
+            logger.exception("Failed to load the catalog cache at startup")
+
+        # Initialize node search index; if it fails here, the first search builds it
+        try:
+            await NodeSearchIndex().load()
+        except Exception:
+            logger.exception("Failed to load the node search index at startup")
+
         # Initialize Supabase client (auth)
         supabase = create_supabase_client()
         app.state.supabase = supabase
 
         yield
     finally:
+        if graph_scheduler is not None:
+            await graph_scheduler.stop()
         if client is not None:
             await client.close()
 
@@ -3,18 +3,24 @@ from typing import Optional
 from adapter.database.location_repository import LocationRepository
 from adapter.database.node_repository import NodeRepository
 from adapter.database.tag_repository import TagRepository
-from adapter.external.graph_adapter import NetworkXGraphService
+from adapter.external.graph_engine import get_graph_engine
 from core.dependencies.auth_dependencies import get_current_admin_user
 from core.dtos.node_dto import NodeCreateDTO, NodeUpdateDTO
 from core.dtos.responses_dto import GeneralResponse
+from core.services.graph_refresh_scheduler import GraphRefreshScheduler
 from core.services.node_service import NodeService
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 router = APIRouter(prefix="/nodes", tags=["Nodes"])
 
-graph_adapter = NetworkXGraphService(NodeRepository())
+graph_adapter = get_graph_engine(NodeRepository())
+refresh_scheduler = GraphRefreshScheduler(graph_adapter)
 service = NodeService(
-    NodeRepository(), LocationRepository(), TagRepository(), graph_adapter
+    NodeRepository(), LocationRepository(), TagRepository(), graph_adapter, refresh_scheduler
+)
+
+WAIT_GRAPH_QUERY = Query(
+    False, description="Wait until the routing graph reflects this write before responding"
 )
 
 
@@ -61,10 +67,12 @@ async def get_missing_tiles(_: str = Depends(get_current_admin_user)):
 
 @router.post("/", response_model=GeneralResponse)
 async def create_node(
-    dto: NodeCreateDTO, _: str = Depends(get_current_admin_user)
+    dto: NodeCreateDTO,
+    wait_graph: bool = WAIT_GRAPH_QUERY,
+    _: str = Depends(get_current_admin_user),
 ):
     try:
-        created_node_dto = await service.create_node(dto)
+        created_node_dto = await service.create_node(dto, wait_for_graph=wait_graph)
 
         return GeneralResponse(
             http_code=status.HTTP_201_CREATED,
@@ -121,6 +129,54 @@ async def search_nodes_by_keywords(
         )
 
 
+@router.get("/autocomplete", response_model=GeneralResponse)
+async def autocomplete_nodes(
+    q: str = Query(..., min_length=1, description="Prefix typed so far"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of suggestions"),
+):
+    try:
+        suggestions = await service.autocomplete(q, limit)
+        return GeneralResponse(
+            http_code=status.HTTP_200_OK,
+            status=True,
+            response_obj=[suggestion.model_dump() for suggestion in suggestions],
+        )
+    except HTTPException as e:
+        return GeneralResponse(
+            http_code=e.status_code, status=False, response_obj={"message": e.detail}
+        )
+    except Exception as e:
+        return GeneralResponse(
+            http_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status=False,
+            response_obj={"message": f"An unexpected error occurred: {str(e)}"},
+        )
+
+
+@router.get("/search/fuzzy", response_model=GeneralResponse)
+async def fuzzy_search_nodes(
+    q: str = Query(..., min_length=1, description="Free-text query; tolerates typos and missing accents"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of ranked results"),
+):
+    try:
+        results = await service.fuzzy_search_nodes(q, limit)
+        return GeneralResponse(
+            http_code=status.HTTP_200_OK,
+            status=True,
+            response_obj=[result.model_dump() for result in results],
+        )
+    except HTTPException as e:
+        return GeneralResponse(
+            http_code=e.status_code, status=False, response_obj={"message": e.detail}
+        )
+    except Exception as e:
+        return GeneralResponse(
+            http_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status=False,
+            response_obj={"message": f"An unexpected error occurred: {str(e)}"},
+        )
+
+
 @router.get("/{name}", response_model=GeneralResponse)
 async def get_node(name: str):
     try:
@@ -180,10 +236,11 @@ async def get_nodes(
 async def update_node(
     name: str,
     dto: NodeUpdateDTO,
+    wait_graph: bool = WAIT_GRAPH_QUERY,
     _: str = Depends(get_current_admin_user),
 ):
     try:
-        updated_node_dto = await service.update_node(name, dto)
+        updated_node_dto = await service.update_node(name, dto, wait_for_graph=wait_graph)
 
         return GeneralResponse(
             http_code=status.HTTP_200_OK,
@@ -203,9 +260,13 @@ async def update_node(
 
 
 @router.delete("/{name}", response_model=GeneralResponse)
-async def delete_node(name: str, _: str = Depends(get_current_admin_user)):
+async def delete_node(
+    name: str,
+    wait_graph: bool = WAIT_GRAPH_QUERY,
+    _: str = Depends(get_current_admin_user),
+):
     try:
-        delete_result = await service.delete_node(name)
+        delete_result = await service.delete_node(name, wait_for_graph=wait_graph)
 
         return GeneralResponse(
             http_code=status.HTTP_200_OK, status=True, response_obj=delete_result
@@ -223,9 +284,12 @@ async def delete_node(name: str, _: str = Depends(get_current_admin_user)):
 
 
 @router.post("/fix-weights", response_model=GeneralResponse)
-async def fix_asymmetric_weights(_: str = Depends(get_current_admin_user)):
+async def fix_asymmetric_weights(
+    wait_graph: bool = WAIT_GRAPH_QUERY,
+    _: str = Depends(get_current_admin_user),
+):
     try:
-        updated_count = await service.fix_asymmetric_weights()
+        updated_count = await service.fix_asymmetric_weights(wait_for_graph=wait_graph)
         return GeneralResponse(
             http_code=status.HTTP_200_OK,
             status=True,
@@ -1,3 +1,5 @@
+from beanie.operators import In
+
 from core.entities.location_model import Location
 
 class LocationRepository:
@@ -10,6 +12,10 @@ class LocationRepository:
 
     async def get_by_link(self, location: Location) -> Location | None:
         return await location.fetch()
+
+    # Resuelve varias ubicaciones con una sola consulta $in
+    async def get_by_ids(self, ids: list) -> list[Location]:
+        return await Location.find(In(Location.id, ids)).to_list()
     
     async def get_all(self) -> list[Location]:
         return await Location.find_all().to_list()
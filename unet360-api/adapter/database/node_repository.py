@@ -1,3 +1,7 @@
+from typing import AsyncIterator, Iterable, Optional
+
+from beanie.operators import In
+
 from core.entities.node_model import Node
 
 class NodeRepository:
@@ -10,7 +14,21 @@ class NodeRepository:
     
     async def get_all(self) -> list[Node]:
         return await Node.find_all().to_list()
-    
+
+    async def get_by_names(self, names: list[str]) -> list[Node]:
+        return await Node.find(In(Node.name, names)).to_list()
+
+    # Proyección cruda para consumidores del grafo: solo `fields` como dicts del cursor,
+    # sin validar con el modelo ni resolver Links; el driver los trae en lotes de `batch_size`
+    async def stream_projection(
+        self, fields: Iterable[str], names: Optional[Iterable[str]] = None, batch_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        collection = Node.get_pymongo_collection()
+        query = {"name": {"$in": list(names)}} if names is not None else {}
+        projection = {**{name: 1 for name in fields}, "_id": 0}
+        async for document in collection.find(query, projection=projection, batch_size=batch_size):
+            yield document
+
     async def get_paginated(self, skip: int, limit: int, search: str = None) -> tuple[list[Node], int]:
         if search:
             query = Node.find(Node.name == {"$regex": search, "$options": "i"})
@@ -0,0 +1,177 @@
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+# Límite de nodos asentados en cada búsqueda de testigos durante la contracción
+_WITNESS_SETTLE_LIMIT = 500
+
+
+def _edge_key(u: str, v: str) -> Tuple[str, str]:
+    return (u, v) if u <= v else (v, u)
+
+
+@dataclass(frozen=True)
+class ContractionHierarchy:
+    """Jerarquía de contracción de un grafo no dirigido.
+
+    `upward[v]` contiene las aristas (originales o atajos) de `v` hacia nodos de
+    mayor rango; `middle[(u, w)]` es el nodo contraído que representa el atajo u-w.
+    """
+    rank: Dict[str, int]
+    upward: Dict[str, Dict[str, float]]
+    middle: Dict[Tuple[str, str], str]
+
+    def path(self, source: str, target: str) -> Optional[List[str]]:
+        """Búsqueda bidireccional solo hacia arriba y desempaquetado de atajos; None si no hay ruta."""
+        if source not in self.rank or target not in self.rank:
+            return None
+        if source == target:
+            return [source]
+
+        distances = ({source: 0.0}, {target: 0.0})
+        parents: Tuple[Dict[str, Optional[str]], Dict[str, Optional[str]]] = ({source: None}, {target: None})
+        queues = ([(0.0, source)], [(0.0, target)])
+        settled = (set(), set())
+        best, meeting = math.inf, None
+
+        while queues[0] or queues[1]:
+            # Se detiene cuando ninguna dirección puede mejorar el mejor punto de encuentro
+            if min(q[0][0] if q else math.inf for q in queues) >= best:
+                break
+            side = 0 if queues[0] and (not queues[1] or queues[0][0][0] <= queues[1][0][0]) else 1
+            distance, node = heapq.heappop(queues[side])
+            if node in settled[side]:
+                continue
+            settled[side].add(node)
+
+            other = distances[1 - side].get(node)
+            if other is not None and distance + other < best:
+                best, meeting = distance + other, node
+
+            for neighbor, weight in self.upward.get(node, {}).items():
+                candidate = distance + weight
+                if candidate < distances[side].get(neighbor, math.inf):
+                    distances[side][neighbor] = candidate
+                    parents[side][neighbor] = node
+                    heapq.heappush(queues[side], (candidate, neighbor))
+
+        if meeting is None:
+            return None
+
+        forward = self._trace(parents[0], meeting)
+        backward = self._trace(parents[1], meeting)
+        up_path = list(reversed(forward)) + backward[1:]
+        return self._unpack(up_path)
+
+    @staticmethod
+    def _trace(parents: Mapping[str, Optional[str]], node: str) -> List[str]:
+        path = [node]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        return path
+
+    def _unpack(self, path: List[str]) -> List[str]:
+        """Sustituye cada atajo por los dos tramos que lo forman hasta llegar a aristas originales."""
+        result = [path[0]]
+        for u, v in zip(path, path[1:]):
+            stack = [(u, v)]
+            while stack:
+                a, b = stack.pop()
+                middle = self.middle.get(_edge_key(a, b))
+                if middle is None:
+                    result.append(b)
+                else:
+                    stack.append((middle, b))
+                    stack.append((a, middle))
+        return result
+
+
+def _witness_distances(
+    graph: Mapping[str, Mapping[str, float]], source: str, excluded: str, limit: float
+) -> Dict[str, float]:
+    """Dijkstra acotado desde `source` sin pasar por `excluded`."""
+    distances = {source: 0.0}
+    queue = [(0.0, source)]
+    settled = 0
+    while queue and settled < _WITNESS_SETTLE_LIMIT:
+        distance, node = heapq.heappop(queue)
+        if distance > distances.get(node, math.inf):
+            continue
+        if distance > limit:
+            break
+        settled += 1
+        for neighbor, weight in graph[node].items():
+            if neighbor == excluded:
+                continue
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, math.inf):
+                distances[neighbor] = candidate
+                heapq.heappush(queue, (candidate, neighbor))
+    return distances
+
+
+def _shortcuts_for(graph: Mapping[str, Mapping[str, float]], node: str) -> List[Tuple[str, str, float]]:
+    """Atajos necesarios al contraer `node`: pares de vecinos sin un camino testigo igual o más corto."""
+    neighbors = list(graph[node].items())
+    shortcuts = []
+    for i, (u, weight_u) in enumerate(neighbors):
+        pending = [(w, weight_u + weight_w) for w, weight_w in neighbors[i + 1:]]
+        if not pending:
+            continue
+        witness = _witness_distances(graph, u, node, max(d for _, d in pending))
+        for w, via_node in pending:
+            if witness.get(w, math.inf) > via_node:
+                shortcuts.append((u, w, via_node))
+    return shortcuts
+
+
+def build_contraction_hierarchy(edges: Iterable[Tuple[str, str, float]]) -> ContractionHierarchy:
+    """Contrae los nodos por orden de importancia (diferencia de aristas + vecinos contraídos)."""
+    graph: Dict[str, Dict[str, float]] = {}
+    for u, v, weight in edges:
+        graph.setdefault(u, {})
+        graph.setdefault(v, {})
+        if u == v:
+            continue
+        if weight < graph[u].get(v, math.inf):
+            graph[u][v] = weight
+            graph[v][u] = weight
+
+    contracted_neighbors = {node: 0 for node in graph}
+
+    def priority(node: str) -> int:
+        return len(_shortcuts_for(graph, node)) - len(graph[node]) + contracted_neighbors[node]
+
+    queue = [(priority(node), node) for node in graph]
+    heapq.heapify(queue)
+
+    rank: Dict[str, int] = {}
+    upward: Dict[str, Dict[str, float]] = {}
+    middle: Dict[Tuple[str, str], str] = {}
+
+    while queue:
+        _, node = heapq.heappop(queue)
+        if node in rank:
+            continue
+        # Actualización perezosa: si la prioridad empeoró, se reinserta
+        current = priority(node)
+        if queue and current > queue[0][0]:
+            heapq.heappush(queue, (current, node))
+            continue
+
+        for u, w, weight in _shortcuts_for(graph, node):
+            if weight < graph[u].get(w, math.inf):
+                graph[u][w] = weight
+                graph[w][u] = weight
+                middle[_edge_key(u, w)] = node
+
+        rank[node] = len(rank)
+        # Todos los vecinos que quedan se contraerán después: son aristas hacia arriba
+        upward[node] = dict(graph[node])
+        for neighbor in graph[node]:
+            del graph[neighbor][node]
+            contracted_neighbors[neighbor] += 1
+        graph[node] = {}
+
+    return ContractionHierarchy(rank=rank, upward=upward, middle=middle)
@@ -0,0 +1,205 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import connected_components, dijkstra
+from core.entities.graph_model import GraphNode, GraphPath
+from adapter.external.destination_trees import ShortestPathTree
+from adapter.external.snapshot_graph_adapter import GraphSnapshot, SnapshotGraphService
+
+
+@dataclass(frozen=True)
+class CSRGraph:
+    """Grafo no dirigido en formato CSR con nombres internados a ids enteros.
+
+    Los vecinos del nodo `i` son `indices[indptr[i]:indptr[i + 1]]` con pesos en
+    la misma franja de `weights`; cada arista aparece en ambos sentidos.
+    """
+    names: List[str]
+    index: Dict[str, int]
+    matrix: csr_array
+
+    @property
+    def indptr(self) -> np.ndarray:
+        return self.matrix.indptr
+
+    @property
+    def indices(self) -> np.ndarray:
+        return self.matrix.indices
+
+    @property
+    def weights(self) -> np.ndarray:
+        return self.matrix.data
+
+    def neighbors(self, node_id: int) -> Dict[str, float]:
+        start, end = self.indptr[node_id], self.indptr[node_id + 1]
+        return {
+            self.names[j]: float(w)
+            for j, w in zip(self.indices[start:end], self.weights[start:end])
+        }
+
+
+def build_csr_graph(adjacency: Mapping[str, Mapping[str, float]]) -> CSRGraph:
+    """Interna los nombres (orden alfabético) y vuelca la adyacencia simétrica {u: {v: peso}} en arrays CSR."""
+    names = sorted(adjacency)
+    index = {name: i for i, name in enumerate(names)}
+    nnz = sum(len(neighbors) for neighbors in adjacency.values())
+
+    rows = np.fromiter((index[u] for u, neighbors in adjacency.items() for _ in neighbors), dtype=np.int32, count=nnz)
+    cols = np.fromiter((index[v] for neighbors in adjacency.values() for v in neighbors), dtype=np.int32, count=nnz)
+    weights = np.fromiter((w for neighbors in adjacency.values() for w in neighbors.values()), dtype=np.float64, count=nnz)
+
+    # Ordenar por fila (y columna) para agrupar los vecinos de cada nodo
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(len(names) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(rows, minlength=len(names)), out=indptr[1:])
+
+    # Se construye a mano para conservar las aristas de peso 0 como entradas explícitas
+    matrix = csr_array((weights[order], cols[order], indptr), shape=(len(names), len(names)))
+    for array in (matrix.data, matrix.indices, matrix.indptr):
+        array.setflags(write=False)
+    return CSRGraph(names=names, index=index, matrix=matrix)
+
+
+class CSRGraphService(SnapshotGraphService):
+    """Adaptador de grafo con arrays CSR (NumPy) y Dijkstra de scipy.sparse.csgraph.
+
+    Pensado para grafos con cientos de miles de panoramas: los nombres se internan
+    a enteros y la adyacencia ocupa tres arrays contiguos en lugar de dicts anidados.
+    """
+    _instance = None
+
+    # Los tres arrays CSR se exportan tal cual y los demás workers los proyectan con mmap
+    supports_shared_graph = True
+
+    def _build_graph(self, edges: Dict[str, Dict[str, float]]) -> CSRGraph:
+        return build_csr_graph(edges)
+
+    def _weighted_neighbors(self, snapshot: GraphSnapshot) -> Callable[[str], Dict[str, float]]:
+        graph = snapshot.graph
+        return lambda node: graph.neighbors(graph.index[node])
+
+    def _shortest_path_tree(self, snapshot: GraphSnapshot, root: str) -> ShortestPathTree:
+        graph = snapshot.graph
+        root_id = graph.index[root]
+        distances, predecessors = dijkstra(
+            graph.matrix, directed=True, indices=root_id, return_predecessors=True
+        )
+        reachable = np.flatnonzero(np.isfinite(distances)).tolist()
+        names = graph.names
+        # El predecesor desde la raíz es el siguiente salto hacia ella (grafo simétrico)
+        parent = {names[i]: (names[p] if p >= 0 else None) for i, p in zip(reachable, predecessors[reachable].tolist())}
+        distance = dict(zip((names[i] for i in reachable), distances[reachable].tolist()))
+        return ShortestPathTree(root=root, parent=parent, distance=distance)
+
+    def _component_index(self, graph: CSRGraph) -> Dict[str, int]:
+        _, labels = connected_components(graph.matrix, directed=False)
+        return dict(zip(graph.names, labels.tolist()))
+
+    def _graph_arrays(self, graph: CSRGraph) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """(nombres, arrays) con los que otro proceso puede proyectar el grafo."""
+        return graph.names, {"indptr": graph.indptr, "indices": graph.indices, "weights": graph.weights}
+
+    def _graph_from_arrays(self, names: List[str], arrays: Mapping[str, np.ndarray]) -> CSRGraph:
+        """CSRGraph sobre los arrays proyectados por mmap: la adyacencia no se copia en cada worker."""
+        matrix = csr_array(
+            (arrays["weights"], arrays["indices"], arrays["indptr"]), shape=(len(names), len(names)), copy=False
+        )
+        return CSRGraph(names=names, index={name: i for i, name in enumerate(names)}, matrix=matrix)
+
+    def _compute_shortest_path(self, snapshot: GraphSnapshot, source: str, target: str) -> Optional[GraphPath]:
+        """Calcula el camino más corto entre dos nodos."""
+        graph = snapshot.graph
+        source_id, target_id = graph.index.get(source), graph.index.get(target)
+        if source_id is None or target_id is None:
+            return None
+        if source_id == target_id:
+            return GraphPath(nodes=[source], total_weight=0)
+
+        # Las aristas ya están en ambos sentidos: se recorre como dirigido para no simetrizar
+        distances, predecessors = dijkstra(
+            graph.matrix, directed=True, indices=source_id, return_predecessors=True
+        )
+        if np.isinf(distances[target_id]):
+            return None
+        return GraphPath(
+            nodes=self._trace(graph, predecessors, source_id, target_id),
+            total_weight=float(distances[target_id])
+        )
+
+    def _compute_paths_from(self, snapshot: GraphSnapshot, source: str, targets: List[str]) -> Dict[str, Optional[GraphPath]]:
+        """Un único Dijkstra desde `source` y reconstrucción del camino a cada destino."""
+        graph = snapshot.graph
+        paths: Dict[str, Optional[GraphPath]] = dict.fromkeys(targets)
+        source_id = graph.index.get(source)
+        if source_id is None:
+            return paths
+
+        distances, predecessors = dijkstra(
+            graph.matrix, directed=True, indices=source_id, return_predecessors=True
+        )
+        for target in targets:
+            target_id = graph.index.get(target)
+            if target_id is None or np.isinf(distances[target_id]):
+                continue
+            paths[target] = GraphPath(
+                nodes=self._trace(graph, predecessors, source_id, target_id),
+                total_weight=float(distances[target_id])
+            )
+        return paths
+
+    def _compute_distances(self, snapshot: GraphSnapshot, source: str, max_weight: Optional[float]) -> Dict[str, float]:
+        """Un Dijkstra de scipy acotado por `max_weight` (se poda todo lo que lo supera)."""
+        graph = snapshot.graph
+        source_id = graph.index.get(source)
+        if source_id is None:
+            return {}
+        distances = dijkstra(
+            graph.matrix, directed=True, indices=source_id, limit=np.inf if max_weight is None else max_weight
+        )
+        reachable = np.flatnonzero(np.isfinite(distances))
+        return {graph.names[i]: float(d) for i, d in zip(reachable.tolist(), distances[reachable].tolist())}
+
+    def _nearest_targets(self, snapshot: GraphSnapshot, source: str, targets: FrozenSet[str], limit: int) -> List[GraphPath]:
+        """Un único Dijkstra desde `source` y selección de los `limit` destinos alcanzables más cercanos."""
+        graph = snapshot.graph
+        source_id = graph.index.get(source)
+        if source_id is None:
+            return []
+        target_ids = np.fromiter((graph.index[t] for t in targets if t in graph.index), dtype=np.int64)
+
+        distances, predecessors = dijkstra(
+            graph.matrix, directed=True, indices=source_id, return_predecessors=True
+        )
+        reachable = target_ids[np.isfinite(distances[target_ids])]
+        nearest = reachable[np.argsort(distances[reachable], kind='stable')[:limit]]
+        return [
+            GraphPath(
+                nodes=self._trace(graph, predecessors, source_id, int(target_id)),
+                total_weight=float(distances[target_id])
+            )
+            for target_id in nearest
+        ]
+
+    @staticmethod
+    def _trace(graph: CSRGraph, predecessors: np.ndarray, source_id: int, target_id: int) -> List[str]:
+        path = [target_id]
+        while path[-1] != source_id:
+            path.append(int(predecessors[path[-1]]))
+        return [graph.names[i] for i in reversed(path)]
+
+    async def get_all_nodes(self) -> List[GraphNode]:
+        """Obtiene todos los nodos del grafo."""
+        graph = self._snapshot.graph
+        return [
+            GraphNode(name=name, adjacent_nodes=graph.neighbors(i))
+            for i, name in enumerate(graph.names)
+        ]
+
+    async def get_adjacent_nodes(self, node_name: str) -> Dict[str, float]:
+        """Obtiene los nodos adyacentes a un nodo específico."""
+        graph = self._snapshot.graph
+        node_id = graph.index.get(node_name)
+        if node_id is None:
+            return {}
+        return graph.neighbors(node_id)
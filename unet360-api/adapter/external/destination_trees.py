@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from typing import Collection, List, Mapping, Optional, Sequence
+
+from core.entities.graph_model import GraphPath
+
+
+@dataclass(frozen=True)
+class ShortestPathTree:
+    """Árbol de caminos más cortos hacia `root` en un grafo no dirigido.
+
+    `parent[v]` es el siguiente salto de `v` hacia `root` y `distance[v]` el peso
+    total hasta él; solo contiene los nodos que alcanzan `root`.
+    """
+    root: str
+    parent: Mapping[str, Optional[str]]
+    distance: Mapping[str, float]
+
+    def path_from(self, source: str) -> Optional[GraphPath]:
+        """Camino de `source` a la raíz siguiendo los punteros; None si no la alcanza."""
+        if source not in self.distance:
+            return None
+        nodes = [source]
+        while nodes[-1] != self.root:
+            nodes.append(self.parent[nodes[-1]])
+        return GraphPath(nodes=nodes, total_weight=self.distance[source])
+
+
+def resolve_hot_destinations(
+    entries: Sequence[str], tag_index: Mapping[str, Mapping[Optional[str], Collection[str]]], graph_nodes: Collection[str]
+) -> List[str]:
+    """Nodos del grafo a partir de la configuración: nombres de nodo o `tag:valor`.
+
+    Los nombres de nodo no pueden contener `:`, así que no hay ambigüedad.
+    """
+    destinations = {}
+    for entry in entries:
+        if ":" in entry:
+            tag, value = entry.split(":", 1)
+            names = tag_index.get(tag, {}).get(value or None, ())
+        else:
+            names = (entry,)
+        for name in sorted(names):
+            if name in graph_nodes:
+                destinations[name] = None
+    return list(destinations)
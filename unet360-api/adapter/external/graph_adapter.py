@@ -1,21 +1,56 @@
+import heapq
+import os
+from itertools import islice
 import networkx as nx
-from typing import Dict, List, Optional
-from core.ports.graph_service_port import GraphServicePort
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional
 from core.entities.graph_model import GraphNode, GraphPath
-from adapter.database.node_repository import NodeRepository
+from adapter.external.contraction_hierarchy import ContractionHierarchy, build_contraction_hierarchy
+from adapter.external.csr_graph_adapter import build_csr_graph
+from adapter.external.destination_trees import ShortestPathTree
+from adapter.external.location_overlay import LocationOverlay, build_location_overlay
+from adapter.external.minimap_heuristic import MinimapHeuristic, calibrate_minimap_heuristic
+from adapter.external.routing_table import RoutingTable, build_routing_table
+from adapter.external.snapshot_graph_adapter import GraphSnapshot, SnapshotGraphService
 
-class NetworkXGraphService(GraphServicePort):
+
+class NetworkXGraphService(SnapshotGraphService):
     """Adaptador de servicio de grafo utilizando NetworkX para manejar nodos y caminos."""
     _instance = None
-    
-    def __new__(cls, node_repository: NodeRepository):
-        """Implementación del patrón para asegurar una única instancia."""
-        if cls._instance is None:
-            cls._instance = super(NetworkXGraphService, cls).__new__(cls)
-            cls._instance.graph = nx.Graph()
-            cls._instance.node_repository = node_repository
-        return cls._instance
-    
+
+    # Por encima de este número de nodos no se precalcula la tabla de rutas (0 la desactiva)
+    routing_table_max_nodes = int(os.getenv("GRAPH_ROUTING_TABLE_MAX_NODES", "2000"))
+    # Búsqueda bajo demanda: `dijkstra` o `astar` (heurística con las coordenadas del minimapa)
+    routing_algorithm = os.getenv("GRAPH_ROUTING_ALGORITHM", "dijkstra").strip().lower()
+    # Preprocesado opcional de jerarquías de contracción tras cada reconstrucción
+    contraction_hierarchy_enabled = os.getenv("GRAPH_CONTRACTION_HIERARCHY", "false").strip().lower() in ("1", "true", "yes")
+    # Enrutado jerárquico por Location (portales entre edificios/áreas)
+    location_routing_enabled = os.getenv("GRAPH_LOCATION_ROUTING", "false").strip().lower() in ("1", "true", "yes")
+
+    @property
+    def graph(self) -> nx.Graph:
+        """Grafo (congelado) de la última versión publicada."""
+        return self._snapshot.graph
+
+    def _build_graph(self, edges: Dict[str, Dict[str, float]]) -> nx.Graph:
+        """Crea un nx.Graph congelado; las aristas añaden los nodos de forma implícita."""
+        graph = nx.Graph()
+        graph.add_weighted_edges_from(
+            (u, v, w) for u, neighbors in edges.items() for v, w in neighbors.items() if u <= v
+        )
+        return nx.freeze(graph)
+
+    def _weighted_neighbors(self, snapshot: GraphSnapshot) -> Callable[[str], Dict[str, float]]:
+        adj = snapshot.graph.adj
+        return lambda node: {neighbor: data['weight'] for neighbor, data in adj[node].items()}
+
+    def _shortest_path_tree(self, snapshot: GraphSnapshot, root: str) -> ShortestPathTree:
+        predecessors, distances = nx.dijkstra_predecessor_and_distance(snapshot.graph, root, weight='weight')
+        parent = {node: (preds[0] if preds else None) for node, preds in predecessors.items()}
+        return ShortestPathTree(root=root, parent=parent, distance=distances)
+
+    def _component_index(self, graph: nx.Graph) -> Dict[str, int]:
+        return {node: i for i, component in enumerate(nx.connected_components(graph)) for node in component}
+
     async def _convert_to_graph_node(self, node) -> GraphNode:
         """Convierte un nodo de la base de datos a un GraphNode."""
         adjacent_nodes = {}
@@ -25,74 +60,147 @@ class NetworkXGraphService(GraphServicePort):
                 weight = adj[adj_name]
                 adjacent_nodes[adj_name] = weight
         return GraphNode(name=node.name, adjacent_nodes=adjacent_nodes)
-    
-    async def refresh_graph(self) -> None:
-        """Refresca el grafo cargando aristas solo si hay adyacencia recíproca con igual peso.
 
-        - Carga los nodos desde BD.
-        - Construye aristas únicamente cuando A->B y B->A existen y el peso coincide.
-        - Excluye del grafo los nodos que no participan en ninguna arista válida.
+    def _derived_builders(self) -> Dict[str, Callable[[GraphSnapshot], Any]]:
+        builders = {**super()._derived_builders(), "routing_table": self._build_routing_table}
+        if self.routing_algorithm == "astar":
+            builders["minimap_heuristic"] = self._build_minimap_heuristic
+        if self.contraction_hierarchy_enabled:
+            builders["contraction_hierarchy"] = self._build_contraction_hierarchy
+        if self.location_routing_enabled:
+            builders["location_overlay"] = self._build_location_overlay
+        return builders
+
+    def _build_location_overlay(self, snapshot: GraphSnapshot) -> LocationOverlay:
+        """Particiona el grafo por la Location de cada nodo y precalcula la capa de portales."""
+        graph = snapshot.graph
+        adjacency = {u: {v: data['weight'] for v, data in neighbors.items()} for u, neighbors in graph.adj.items()}
+        locations = {name: record.location for name, record in snapshot.records.items() if name in graph}
+        return build_location_overlay(adjacency, locations)
+
+    def _build_contraction_hierarchy(self, snapshot: GraphSnapshot) -> ContractionHierarchy:
+        """Contrae el grafo de la versión indicada (mismas aristas recíprocas que el grafo publicado)."""
+        return build_contraction_hierarchy(snapshot.graph.edges(data='weight'))
+
+    def _build_minimap_heuristic(self, snapshot: GraphSnapshot) -> MinimapHeuristic:
+        """Calibra la heurística de A* con las coordenadas de los nodos presentes en el grafo."""
+        graph = snapshot.graph
+        coordinates = {
+            name: record.coordinates
+            for name, record in snapshot.records.items()
+            if record.coordinates is not None and name in graph
+        }
+        return calibrate_minimap_heuristic(graph.edges(data='weight'), coordinates)
+
+    def _build_routing_table(self, snapshot: GraphSnapshot) -> Optional[RoutingTable]:
+        """Tabla de siguiente salto de todos los pares, solo para grafos pequeños y medianos."""
+        graph = snapshot.graph
+        if not 0 < graph.number_of_nodes() <= self.routing_table_max_nodes:
+            return None
+        adjacency = {u: {v: data['weight'] for v, data in neighbors.items()} for u, neighbors in graph.adj.items()}
+        return build_routing_table(build_csr_graph(adjacency))
+
+    def _compute_shortest_path(self, snapshot: GraphSnapshot, source: str, target: str) -> Optional[GraphPath]:
+        """Calcula el camino más corto entre dos nodos.
+
+        Por orden de preferencia, con las estructuras ya listas para esta versión:
+        tabla de rutas (O(longitud del camino)), jerarquía de contracción, capa de
+        portales por Location, A* cuando está activado y el destino tiene
+        coordenadas de minimapa, o un único Dijkstra (camino y peso).
         """
-        db_nodes = await self.node_repository.get_all()
-        self.graph.clear()
-
-        # Índice para consultas rápidas
-        name_to_node = {n.name: n for n in db_nodes}
-
-        # Recolectar aristas válidas (evitar duplicados con ordenación de extremos)
-        valid_edges: set[tuple[str, str, float]] = set()
-
-        for node in db_nodes:
-            # Cada entrada de adjacent_nodes puede ser None o un dict {name: weight}
-            for adj in (getattr(node, 'adjacent_nodes', None) or []):
-                if not isinstance(adj, dict) or len(adj) != 1:
-                    continue
-                (neighbor_name, weight), = adj.items()
-                if neighbor_name not in name_to_node:
-                    continue
-                # Validar reciprocity con igual peso
-                neighbor = name_to_node[neighbor_name]
-                reciprocal_ok = False
-                for back in (getattr(neighbor, 'adjacent_nodes', None) or []):
-                    if isinstance(back, dict) and node.name in back:
-                        back_weight = back[node.name]
-                        if back_weight is not None and weight is not None and back_weight == weight:
-                            reciprocal_ok = True
-                        break
-                if not reciprocal_ok:
-                    continue
-                # Edge válida
-                u, v = sorted((node.name, neighbor_name))
-                valid_edges.add((u, v, float(weight)))
-
-        # Crear aristas válidas; esto añade los nodos de forma implícita
-        for u, v, w in valid_edges:
-            self.graph.add_edge(u, v, weight=w)
-
-        # No añadimos nodos aislados: sólo quedan los que participan en aristas
-    
-    async def get_shortest_path(self, source: str, target: str) -> Optional[GraphPath]:
-        """Calcula el camino más corto entre dos nodos."""
+        graph = snapshot.graph
+        for name in ("routing_table", "contraction_hierarchy", "location_overlay"):
+            accelerator = self._derived_for(name, snapshot)
+            if accelerator is None:
+                continue
+            path = accelerator.path(source, target)
+            if path is None:
+                return None
+            return GraphPath(nodes=path, total_weight=self._path_weight(graph, path))
+
+        heuristic = None
+        minimap_heuristic = self._derived_for("minimap_heuristic", snapshot)
+        if minimap_heuristic is not None:
+            heuristic = minimap_heuristic.for_target(target)
+
         try:
-            path = nx.shortest_path(self.graph, source=source, target=target, weight='weight')
-            total_weight = nx.shortest_path_length(self.graph, source=source, target=target, weight='weight')
+            if heuristic is not None:
+                path = nx.astar_path(graph, source, target, heuristic=heuristic, weight='weight')
+                return GraphPath(nodes=path, total_weight=self._path_weight(graph, path))
+            total_weight, path = nx.single_source_dijkstra(graph, source=source, target=target, weight='weight')
             return GraphPath(nodes=path, total_weight=total_weight)
         except (nx.NetworkXNoPath, nx.NodeNotFound):
             return None
-    
+
+    def _compute_paths_from(self, snapshot: GraphSnapshot, source: str, targets: List[str]) -> Dict[str, Optional[GraphPath]]:
+        """Con tabla de rutas, jerarquía o capa de portales lista se resuelve cada destino con
+        ella; si no, un único Dijkstra desde `source` hasta asentar todos los destinos."""
+        if any(
+            self._derived_for(name, snapshot) is not None
+            for name in ("routing_table", "contraction_hierarchy", "location_overlay")
+        ):
+            return {target: self._compute_shortest_path(snapshot, source, target) for target in targets}
+
+        paths: Dict[str, Optional[GraphPath]] = dict.fromkeys(targets)
+        for path in self._settle_targets(snapshot.graph, source, frozenset(targets)):
+            paths[path.nodes[-1]] = path
+        return paths
+
+    def _compute_distances(self, snapshot: GraphSnapshot, source: str, max_weight: Optional[float]) -> Dict[str, float]:
+        return nx.single_source_dijkstra_path_length(snapshot.graph, source, cutoff=max_weight, weight='weight')
+
+    def _nearest_targets(self, snapshot: GraphSnapshot, source: str, targets: FrozenSet[str], limit: int) -> List[GraphPath]:
+        """Dijkstra desde `source` que se detiene al asentar `limit` destinos."""
+        return list(islice(self._settle_targets(snapshot.graph, source, targets), limit))
+
+    @staticmethod
+    def _settle_targets(graph: nx.Graph, source: str, targets: FrozenSet[str]) -> Iterator[GraphPath]:
+        """Dijkstra perezoso: produce el camino a cada destino en orden de distancia y
+        termina en cuanto se han asentado todos (o no quedan nodos alcanzables)."""
+        if source not in graph:
+            return
+
+        distances = {source: 0.0}
+        parents: Dict[str, Optional[str]] = {source: None}
+        queue = [(0.0, source)]
+        settled = set()
+        remaining = len(targets)
+        while queue and remaining:
+            distance, node = heapq.heappop(queue)
+            if node in settled:
+                continue
+            settled.add(node)
+            if node in targets:
+                remaining -= 1
+                path = [node]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                yield GraphPath(nodes=path[::-1], total_weight=distance)
+            for neighbor, data in graph.adj[node].items():
+                candidate = distance + data['weight']
+                if candidate < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = candidate
+                    parents[neighbor] = node
+                    heapq.heappush(queue, (candidate, neighbor))
+
+    @staticmethod
+    def _path_weight(graph: nx.Graph, path: List[str]) -> float:
+        return sum(graph.adj[u][v]['weight'] for u, v in zip(path, path[1:]))
+
     async def get_all_nodes(self) -> List[GraphNode]:
         """Obtiene todos los nodos del grafo."""
-        nodes = []
-        for node_name in self.graph.nodes():
-            adjacent_nodes = await self.get_adjacent_nodes(node_name)  # Añadimos await aquí
-            nodes.append(GraphNode(
-                name=node_name,
-                adjacent_nodes=adjacent_nodes  # Ahora sí es un dict, no una corrutina
-            ))
-        return nodes
-    
+        graph = self._snapshot.graph
+        return [
+            GraphNode(name=node_name, adjacent_nodes=self._adjacent(graph, node_name))
+            for node_name in graph.nodes()
+        ]
+
     async def get_adjacent_nodes(self, node_name: str) -> Dict[str, float]:
         """Obtiene los nodos adyacentes a un nodo específico."""
-        if node_name not in self.graph:
+        return self._adjacent(self._snapshot.graph, node_name)
+
+    @staticmethod
+    def _adjacent(graph: nx.Graph, node_name: str) -> Dict[str, float]:
+        if node_name not in graph:
             return {}
-        return {n: self.graph.edges[node_name, n]['weight'] for n in self.graph.neighbors(node_name)}
\ No newline at end of file
+        return {n: data['weight'] for n, data in graph.adj[node_name].items()}
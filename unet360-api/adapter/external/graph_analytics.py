@@ -0,0 +1,58 @@
+from typing import Callable, Dict, Iterable, List, Mapping, Set, Tuple
+
+Neighbors = Callable[[str], Mapping[str, float]]
+
+
+def find_cut_elements(
+    nodes: Iterable[str], neighbors: Neighbors
+) -> Tuple[List[Tuple[str, str, int]], Set[str]]:
+    """Puentes y puntos de articulación con un DFS iterativo de Tarjan (O(V + E)).
+
+    Cada puente se devuelve como (u, v, nodos que quedan separados), siendo ese
+    último valor el tamaño del lado más pequeño de su componente al cortarlo.
+    """
+    discovery: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    subtree: Dict[str, int] = {}
+    bridges: List[Tuple[str, str, int]] = []
+    articulation: Set[str] = set()
+
+    for root in nodes:
+        if root in discovery:
+            continue
+        discovery[root] = low[root] = len(discovery)
+        subtree[root] = 1
+        root_children = 0
+        tree_edges: List[Tuple[str, str]] = []
+        stack = [(root, None, iter(neighbors(root)))]
+        while stack:
+            node, parent, pending = stack[-1]
+            for neighbor in pending:
+                if neighbor == node or neighbor == parent:
+                    continue
+                if neighbor in discovery:
+                    low[node] = min(low[node], discovery[neighbor])
+                    continue
+                discovery[neighbor] = low[neighbor] = len(discovery)
+                subtree[neighbor] = 1
+                if node == root:
+                    root_children += 1
+                tree_edges.append((node, neighbor))
+                stack.append((neighbor, node, iter(neighbors(neighbor))))
+                break
+            else:
+                stack.pop()
+                if parent is not None:
+                    low[parent] = min(low[parent], low[node])
+                    subtree[parent] += subtree[node]
+                    if parent != root and low[node] >= discovery[parent]:
+                        articulation.add(parent)
+
+        # Con el tamaño final de la componente ya se sabe qué lado de cada puente es el pequeño
+        size = subtree[root]
+        for parent, child in tree_edges:
+            if low[child] > discovery[parent]:
+                bridges.append((parent, child, min(subtree[child], size - subtree[child])))
+        if root_children > 1:
+            articulation.add(root)
+    return bridges, articulation
@@ -0,0 +1,51 @@
+from typing import Any, Hashable, Optional
+from cachetools import LRUCache
+
+# Centinela para distinguir "no cacheado" de un resultado None cacheado
+MISSING = object()
+
+
+class VersionedLRUCache:
+    """LRU acotado cuyas entradas pertenecen a una única versión del grafo.
+
+    Al llegar una versión más nueva se vacía, de modo que una reconstrucción del
+    grafo invalida la caché automáticamente; los resultados calculados sobre una
+    versión ya sustituida no se guardan. Admite valores `None` (p. ej. "no hay camino").
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._cache = LRUCache(maxsize=max(maxsize, 1))
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _is_current(self, version: int) -> bool:
+        if self._version is None or version > self._version:
+            self._cache.clear()
+            self._version = version
+        return version == self._version
+
+    def get(self, version: int, key: Hashable) -> Any:
+        """Devuelve el valor cacheado para la versión o `MISSING`."""
+        value = self._cache.get(key, MISSING) if self._is_current(version) else MISSING
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, version: int, key: Hashable, value: Any) -> None:
+        if self.maxsize > 0 and self._is_current(version):
+            self._cache[key] = value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "version": self._version,
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,118 @@
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Set, Tuple
+
+Edges = Mapping[str, Mapping[str, float]]
+
+
+class ConnectedComponents:
+    """Componentes conexas mantenidas de forma incremental: {nodo: id} y {id: nodos}.
+
+    Una arista nueva une dos componentes reetiquetando la más pequeña. Al quitar
+    aristas, una búsqueda en anchura intercalada desde los extremos que siguen en
+    el grafo se detiene en cuanto todas se encuentran o solo queda una sin agotar;
+    cada lado agotado pasa a ser una componente nueva. El coste depende de los
+    trozos pequeños, no del tamaño de la componente.
+    """
+
+    def __init__(self, labels: Mapping[str, int]):
+        self.labels: Dict[str, int] = dict(labels)
+        self.members: Dict[int, Set[str]] = {}
+        for node, label in self.labels.items():
+            self.members.setdefault(label, set()).add(node)
+        self._next_label = max(self.members, default=-1) + 1
+
+    def _new_label(self, nodes: Iterable[str]) -> int:
+        label = self._next_label
+        self._next_label += 1
+        self.members[label] = set(nodes)
+        for node in self.members[label]:
+            self.labels[node] = label
+        return label
+
+    def _merge(self, a: int, b: int) -> None:
+        if len(self.members[a]) < len(self.members[b]):
+            a, b = b, a
+        moved = self.members.pop(b)
+        for node in moved:
+            self.labels[node] = a
+        self.members[a] |= moved
+
+    def _discard(self, node: str) -> None:
+        label = self.labels.pop(node)
+        members = self.members[label]
+        members.discard(node)
+        if not members:
+            del self.members[label]
+
+    def update(self, edges: Edges, removed: Iterable[Tuple[str, str]], added: Iterable[Tuple[str, str]]) -> None:
+        """Aplica las aristas quitadas y añadidas; `edges` es la adyacencia ya actualizada
+        (un nodo sin entrada en ella ya no está en el grafo)."""
+        for u, v in added:
+            for node in (u, v):
+                if node not in self.labels:
+                    self._new_label((node,))
+            if self.labels[u] != self.labels[v]:
+                self._merge(self.labels[u], self.labels[v])
+
+        # Extremos de aristas quitadas que siguen en el grafo, agrupados por componente:
+        # solo puede haberse partido una componente con dos o más de ellos
+        seeds: Dict[int, Set[str]] = {}
+        for u, v in removed:
+            for node in (u, v):
+                if node not in edges:
+                    if node in self.labels:
+                        self._discard(node)
+                elif node in self.labels:
+                    seeds.setdefault(self.labels[node], set()).add(node)
+        for label, nodes in seeds.items():
+            if len(nodes) > 1:
+                self._split(edges, label, nodes)
+
+    def _split(self, edges: Edges, label: int, seeds: Set[str]) -> None:
+        # Una búsqueda por semilla; al tocarse se fusionan (la menor en la mayor)
+        parent = {seed: seed for seed in seeds}
+
+        def find(search: str) -> str:
+            while parent[search] != search:
+                parent[search] = parent[parent[search]]
+                search = parent[search]
+            return search
+
+        owner: Dict[str, str] = {seed: seed for seed in seeds}
+        queues: Dict[str, deque] = {seed: deque((seed,)) for seed in seeds}
+        visited: Dict[str, List[str]] = {seed: [seed] for seed in seeds}
+        live = set(seeds)
+        while len(live) > 1:
+            for search in list(live):
+                if len(live) == 1:
+                    break
+                if search not in live:
+                    continue
+                queue = queues[search]
+                if not queue:
+                    # Búsqueda agotada sin encontrar a las demás: es una componente aparte
+                    live.discard(search)
+                    del queues[search]
+                    nodes = visited.pop(search)
+                    members = self.members[label]
+                    for node in nodes:
+                        members.discard(node)
+                    self._new_label(nodes)
+                    continue
+                node = queue.popleft()
+                for neighbor in edges.get(node, ()):
+                    other = owner.get(neighbor)
+                    if other is None:
+                        owner[neighbor] = search
+                        queue.append(neighbor)
+                        visited[search].append(neighbor)
+                        continue
+                    other = find(other)
+                    if other == search:
+                        continue
+                    keep, drop = (search, other) if len(visited[search]) >= len(visited[other]) else (other, search)
+                    parent[drop] = keep
+                    queues[keep].extend(queues.pop(drop))
+                    visited[keep].extend(visited.pop(drop))
+                    live.discard(drop)
+                    search, queue = keep, queues[keep]
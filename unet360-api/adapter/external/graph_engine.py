@@ -0,0 +1,18 @@
+import os
+from core.ports.graph_service_port import GraphServicePort
+from adapter.database.node_repository import NodeRepository
+from adapter.external.graph_adapter import NetworkXGraphService
+from adapter.external.csr_graph_adapter import CSRGraphService
+
+GRAPH_ENGINES = {
+    "networkx": NetworkXGraphService,
+    "csr": CSRGraphService,
+}
+
+
+def get_graph_engine(node_repository: NodeRepository) -> GraphServicePort:
+    """Devuelve el motor de grafo configurado en GRAPH_ENGINE (networkx | csr)."""
+    engine = os.getenv("GRAPH_ENGINE", "networkx").strip().lower()
+    if engine not in GRAPH_ENGINES:
+        raise ValueError(f"Unknown GRAPH_ENGINE '{engine}'; expected one of {sorted(GRAPH_ENGINES)}")
+    return GRAPH_ENGINES[engine](node_repository)
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from typing import Any, Dict, Mapping, Tuple
+
+import numpy as np
+
+# Formato: MAGIC | versión (uint32) | longitud de la cabecera (uint64) | cabecera JSON | arrays alineados
+MAGIC = b"UNET360G"
+FORMAT_VERSION = 1
+_PREAMBLE = len(MAGIC) + 4 + 8
+_ALIGNMENT = 64
+
+
+class GraphFileError(Exception):
+    """El fichero no existe, está truncado, es de otra versión o su checksum no coincide."""
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _checksum(arrays: Mapping[str, np.ndarray]) -> str:
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return digest.hexdigest()
+
+
+def write_graph_file(path: str, header: Mapping[str, Any], arrays: Mapping[str, np.ndarray]) -> None:
+    """Escribe cabecera y arrays de forma atómica (fichero temporal + rename).
+
+    Cada array queda alineado a 64 bytes para poder leerse sin copia con mmap;
+    la cabecera guarda dtype, forma y offset de cada uno y el checksum del contenido.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout, offset, end = {}, 0, 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        end = offset + array.nbytes
+        offset = _aligned(end)
+
+    encoded = json.dumps(
+        {**header, "checksum": _checksum(arrays), "arrays": layout}, separators=(",", ":")
+    ).encode()
+    data_start = _aligned(_PREAMBLE + len(encoded))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".graph-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint32(FORMAT_VERSION).tobytes())
+            f.write(np.uint64(len(encoded)).tobytes())
+            f.write(encoded)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + end)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_graph_file(path: str, verify: bool = True) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Lee un fichero de grafo con mmap; los arrays son vistas de solo lectura sobre el fichero.
+
+    Con `verify` se recalcula el checksum (recorre todos los bytes una vez).
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise GraphFileError(f"Cannot open graph file '{path}': {e}") from e
+
+    if len(buffer) < _PREAMBLE or buffer[:len(MAGIC)] != MAGIC:
+        raise GraphFileError(f"'{path}' is not a graph file")
+    version = int(np.frombuffer(buffer, dtype=np.uint32, count=1, offset=len(MAGIC))[0])
+    if version != FORMAT_VERSION:
+        raise GraphFileError(f"Unsupported graph file format {version} in '{path}'")
+    header_length = int(np.frombuffer(buffer, dtype=np.uint64, count=1, offset=len(MAGIC) + 4)[0])
+    try:
+        header = json.loads(buffer[_PREAMBLE:_PREAMBLE + header_length])
+    except ValueError as e:
+        raise GraphFileError(f"Corrupted header in '{path}'") from e
+
+    data_start = _aligned(_PREAMBLE + header_length)
+    arrays = {}
+    for name, spec in header.pop("arrays").items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        start = data_start + spec["offset"]
+        if start + count * dtype.itemsize > len(buffer):
+            raise GraphFileError(f"Truncated graph file '{path}'")
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(spec["shape"])
+
+    if verify and _checksum(arrays) != header.get("checksum"):
+        raise GraphFileError(f"Checksum mismatch in '{path}'")
+    return header, arrays
+
+
+def encode_strings(values) -> Tuple[np.ndarray, np.ndarray]:
+    """Interna una lista de cadenas como (offsets int64, bytes UTF-8 concatenados)."""
+    encoded = [value.encode() for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def decode_strings(offsets: np.ndarray, data: np.ndarray) -> list[str]:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[start:end].decode() for start, end in zip(bounds, bounds[1:])]
@@ -0,0 +1,90 @@
+import heapq
+import math
+import threading
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+Neighbors = Callable[[str], Mapping[str, float]]
+
+
+def _restricted_dijkstra(
+    neighbors: Neighbors,
+    source: str,
+    target: str,
+    banned_nodes: Set[str],
+    banned_edges: Set[Tuple[str, str]],
+) -> Optional[Tuple[float, List[str]]]:
+    """Dijkstra de `source` a `target` sin pasar por `banned_nodes` ni usar `banned_edges` (u, v)."""
+    distances = {source: 0.0}
+    parents: Dict[str, Optional[str]] = {source: None}
+    queue = [(0.0, source)]
+    settled = set()
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if node in settled:
+            continue
+        if node == target:
+            path = [node]
+            while parents[path[-1]] is not None:
+                path.append(parents[path[-1]])
+            return distance, path[::-1]
+        settled.add(node)
+        for neighbor, weight in neighbors(node).items():
+            if neighbor == node or neighbor in banned_nodes or (node, neighbor) in banned_edges:
+                continue
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, math.inf):
+                distances[neighbor] = candidate
+                parents[neighbor] = node
+                heapq.heappush(queue, (candidate, neighbor))
+    return None
+
+
+class KShortestPaths:
+    """Estado reanudable del algoritmo de Yen para un par (origen, destino).
+
+    Guarda los caminos ya aceptados y el montículo de candidatos, de modo que pedir
+    más alternativas continúa la búsqueda en lugar de repetirla. Es seguro usarlo
+    desde varios hilos: cada ampliación se hace con el lock tomado.
+    """
+
+    def __init__(self, neighbors: Neighbors, source: str, target: str, first: Optional[Tuple[float, List[str]]]):
+        self._neighbors = neighbors
+        self._source = source
+        self._target = target
+        self._lock = threading.Lock()
+        self._accepted: List[Tuple[float, List[str]]] = [first] if first is not None else []
+        self._candidates: List[Tuple[float, int, Tuple[str, ...]]] = []
+        self._seen = {tuple(first[1])} if first is not None else set()
+        # Índice del siguiente camino aceptado cuyas desviaciones faltan por generar
+        self._expanded = 0
+
+    def take(self, k: int) -> List[Tuple[float, List[str]]]:
+        """Hasta `k` caminos sin ciclos en orden de peso: [(peso, nodos)]."""
+        with self._lock:
+            while len(self._accepted) < k and self._expanded < len(self._accepted):
+                self._spur_from(self._accepted[self._expanded][1])
+                self._expanded += 1
+                if not self._candidates:
+                    break
+                weight, _, path = heapq.heappop(self._candidates)
+                self._accepted.append((weight, list(path)))
+            return list(self._accepted[:k])
+
+    def _spur_from(self, previous: List[str]) -> None:
+        """Genera los candidatos que se desvían de `previous` en cada uno de sus nodos."""
+        for i in range(len(previous) - 1):
+            spur_node, root = previous[i], previous[:i + 1]
+            banned_edges = {
+                (path[i], path[i + 1])
+                for _, path in self._accepted
+                if len(path) > i + 1 and path[:i + 1] == root
+            }
+            spur = _restricted_dijkstra(self._neighbors, spur_node, self._target, set(root[:-1]), banned_edges)
+            if spur is None:
+                continue
+            path = tuple(root[:-1] + spur[1])
+            if path in self._seen:
+                continue
+            self._seen.add(path)
+            weight = sum(self._neighbors(u)[v] for u, v in zip(path, path[1:]))
+            heapq.heappush(self._candidates, (weight, len(path), path))
@@ -0,0 +1,124 @@
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Mapping, Optional, Set, Tuple
+
+
+def _cell_dijkstra(
+    adjacency: Mapping[str, Mapping[str, float]], cell: Mapping[str, Hashable], source: str
+) -> Tuple[Dict[str, float], Dict[str, Optional[str]]]:
+    """Dijkstra desde `source` sin salir de su ubicación: (distancias, padres hacia `source`)."""
+    home = cell[source]
+    distances = {source: 0.0}
+    parents: Dict[str, Optional[str]] = {source: None}
+    queue = [(0.0, source)]
+    settled = set()
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if node in settled:
+            continue
+        settled.add(node)
+        for neighbor, weight in adjacency[node].items():
+            if cell[neighbor] != home:
+                continue
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, math.inf):
+                distances[neighbor] = candidate
+                parents[neighbor] = node
+                heapq.heappush(queue, (candidate, neighbor))
+    return distances, parents
+
+
+@dataclass(frozen=True)
+class LocationOverlay:
+    """Enrutado jerárquico con el grafo particionado por `Location`.
+
+    Los portales son los nodos con alguna arista hacia otra ubicación. `overlay[p]`
+    contiene las aristas entre ubicaciones de cada portal y los atajos a los demás
+    portales de su ubicación (distancia mínima sin salir de ella); `trees[p]` son
+    los punteros de la búsqueda interna desde `p` para desempaquetar esos atajos.
+    """
+    adjacency: Mapping[str, Mapping[str, float]]
+    cell: Mapping[str, Hashable]
+    overlay: Mapping[str, Mapping[str, float]]
+    trees: Mapping[str, Mapping[str, Optional[str]]]
+
+    def path(self, source: str, target: str) -> Optional[List[str]]:
+        """Busca solo dentro de las ubicaciones de origen y destino más la capa de portales."""
+        if source not in self.cell or target not in self.cell:
+            return None
+        if source == target:
+            return [source]
+
+        open_cells = {self.cell[source], self.cell[target]}
+        distances = {source: 0.0}
+        parents: Dict[str, Optional[Tuple[str, bool]]] = {source: None}
+        queue = [(0.0, source)]
+        settled: Set[str] = set()
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if node in settled:
+                continue
+            if node == target:
+                return self._unpack(parents, target)
+            settled.add(node)
+
+            edges: List[Tuple[str, float, bool]] = []
+            if self.cell[node] in open_cells:
+                edges.extend(
+                    (neighbor, weight, False)
+                    for neighbor, weight in self.adjacency[node].items()
+                    if self.cell[neighbor] == self.cell[node]
+                )
+            for neighbor, weight in self.overlay.get(node, {}).items():
+                edges.append((neighbor, weight, self.cell[neighbor] == self.cell[node]))
+
+            for neighbor, weight, shortcut in edges:
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, math.inf):
+                    distances[neighbor] = candidate
+                    parents[neighbor] = (node, shortcut)
+                    heapq.heappush(queue, (candidate, neighbor))
+        return None
+
+    def _unpack(self, parents: Mapping[str, Optional[Tuple[str, bool]]], target: str) -> List[str]:
+        reversed_path = [target]
+        while parents[reversed_path[-1]] is not None:
+            node = reversed_path[-1]
+            previous, shortcut = parents[node]
+            if shortcut:
+                # Tramo interno previous -> node: se sigue el árbol de `previous` desde `node`
+                tree = self.trees[previous]
+                step = tree[node]
+                while step != previous:
+                    reversed_path.append(step)
+                    step = tree[step]
+            reversed_path.append(previous)
+        return reversed_path[::-1]
+
+
+def build_location_overlay(
+    adjacency: Mapping[str, Mapping[str, float]], locations: Mapping[str, Hashable]
+) -> LocationOverlay:
+    """Detecta los portales y precalcula las distancias entre portales de cada ubicación.
+
+    `locations` da la ubicación de cada nodo; los que no tienen forman su propia partición (None).
+    """
+    cell = {node: locations.get(node) for node in adjacency}
+    overlay: Dict[str, Dict[str, float]] = {}
+    portals_by_cell: Dict[Hashable, List[str]] = {}
+    for node, neighbors in adjacency.items():
+        crossing = {v: w for v, w in neighbors.items() if cell[v] != cell[node]}
+        if crossing:
+            overlay[node] = crossing
+            portals_by_cell.setdefault(cell[node], []).append(node)
+
+    trees: Dict[str, Dict[str, Optional[str]]] = {}
+    for portals in portals_by_cell.values():
+        for portal in portals:
+            distances, parents = _cell_dijkstra(adjacency, cell, portal)
+            trees[portal] = parents
+            for other in portals:
+                if other != portal and other in distances:
+                    overlay[portal][other] = distances[other]
+    return LocationOverlay(adjacency=adjacency, cell=cell, overlay=overlay, trees=trees)
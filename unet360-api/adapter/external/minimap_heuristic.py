@@ -0,0 +1,95 @@
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+Coordinates = Tuple[str, float, float]
+
+# Holgura para errores de coma flotante en la comprobación de consistencia
+_EPSILON = 1e-9
+
+
+@dataclass(frozen=True)
+class MinimapHeuristic:
+    """Heurística de A* basada en las coordenadas del minimapa de cada nodo.
+
+    Para un destino en la imagen `I`, h(v) = escala[I] * distancia euclídea
+    (en píxeles) de v al destino si v está en la misma imagen, y 0 si no. Las
+    escalas se calibran para que la heurística sea consistente (y por tanto
+    admisible) con los pesos de las aristas.
+    """
+    coordinates: Mapping[str, Coordinates]
+    scales: Dict[str, float]
+
+    def for_target(self, target: str) -> Optional[Callable[[str, str], float]]:
+        """Heurística hacia `target`; None si el destino no tiene coordenadas útiles (usar Dijkstra)."""
+        target_coordinates = self.coordinates.get(target)
+        if target_coordinates is None:
+            return None
+        image, target_x, target_y = target_coordinates
+        scale = self.scales.get(image, 0.0)
+        if scale <= 0:
+            return None
+
+        coordinates = self.coordinates
+
+        def heuristic(node: str, _target: str) -> float:
+            node_coordinates = coordinates.get(node)
+            if node_coordinates is None or node_coordinates[0] != image:
+                return 0.0
+            return scale * math.hypot(node_coordinates[1] - target_x, node_coordinates[2] - target_y)
+
+        return heuristic
+
+
+def calibrate_minimap_heuristic(
+    edges: Iterable[Tuple[str, str, float]],
+    coordinates: Mapping[str, Coordinates],
+) -> MinimapHeuristic:
+    """Calcula por imagen la mayor escala píxel -> peso que mantiene la heurística consistente.
+
+    - Arista dentro de una imagen: escala <= peso / distancia en píxeles.
+    - Arista que sale de la imagen (o hacia un nodo sin coordenadas), donde el
+      otro extremo tiene h = 0: escala <= peso / distancia máxima del nodo a
+      cualquier punto de la imagen (acotada por las esquinas de su caja).
+    Una imagen sin aristas que la acoten queda con escala 0 (Dijkstra).
+    """
+    edges = list(edges)
+
+    bounds: Dict[str, list] = {}
+    for image, x, y in coordinates.values():
+        box = bounds.setdefault(image, [x, y, x, y])
+        box[0], box[1] = min(box[0], x), min(box[1], y)
+        box[2], box[3] = max(box[2], x), max(box[3], y)
+
+    def farthest(point: Coordinates) -> float:
+        image, x, y = point
+        min_x, min_y, max_x, max_y = bounds[image]
+        return math.hypot(max(x - min_x, max_x - x), max(y - min_y, max_y - y))
+
+    scales: Dict[str, float] = defaultdict(lambda: math.inf)
+    for u, v, weight in edges:
+        cu, cv = coordinates.get(u), coordinates.get(v)
+        if cu is not None and cv is not None and cu[0] == cv[0]:
+            distance = math.hypot(cu[1] - cv[1], cu[2] - cv[2])
+            if distance > 0:
+                scales[cu[0]] = min(scales[cu[0]], weight / distance)
+            continue
+        for point in (cu, cv):
+            if point is None:
+                continue
+            reach = farthest(point)
+            if reach > 0:
+                scales[point[0]] = min(scales[point[0]], weight / reach)
+
+    scales = {image: (0.0 if math.isinf(scale) else max(scale, 0.0)) for image, scale in scales.items()}
+
+    # Comprobación de consistencia: ante cualquier violación se desactiva la imagen
+    for u, v, weight in edges:
+        cu, cv = coordinates.get(u), coordinates.get(v)
+        if cu is not None and cv is not None and cu[0] == cv[0]:
+            distance = math.hypot(cu[1] - cv[1], cu[2] - cv[2])
+            if scales.get(cu[0], 0.0) * distance > weight + _EPSILON:
+                scales[cu[0]] = 0.0
+
+    return MinimapHeuristic(coordinates=coordinates, scales=scales)
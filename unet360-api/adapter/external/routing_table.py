@@ -0,0 +1,78 @@
+import multiprocessing
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional
+from scipy.sparse.csgraph import dijkstra
+
+if TYPE_CHECKING:
+    from adapter.external.csr_graph_adapter import CSRGraph
+
+# Valor que usa scipy.sparse.csgraph para "sin predecesor"
+NO_HOP = -9999
+
+# Proceso auxiliar para el Dijkstra de todos los pares: scipy no suelta el GIL y en un
+# hilo bloquearía el bucle de eventos durante toda la construcción
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RoutingTable:
+    """Tabla de siguiente salto de todos los pares para una versión del grafo.
+
+    `next_hop[t, s]` es el vecino de `s` por el que sigue el camino más corto
+    hacia `t` (el grafo es no dirigido, así que coincide con el predecesor de
+    `s` en el árbol de Dijkstra con raíz `t`). Se guarda como int32 (n² * 4 bytes).
+    """
+    names: List[str]
+    index: Dict[str, int]
+    next_hop: np.ndarray
+
+    def path(self, source: str, target: str) -> Optional[List[str]]:
+        """Recorre la tabla en O(longitud del camino); None si no hay ruta o algún nodo no existe."""
+        source_id, target_id = self.index.get(source), self.index.get(target)
+        if source_id is None or target_id is None:
+            return None
+        row = self.next_hop[target_id]
+        node_ids = [source_id]
+        while node_ids[-1] != target_id:
+            hop = int(row[node_ids[-1]])
+            if hop == NO_HOP:
+                return None
+            node_ids.append(hop)
+        return [self.names[i] for i in node_ids]
+
+
+def _next_hop_matrix(matrix) -> np.ndarray:
+    # Se ejecuta en el proceso auxiliar: solo viaja de vuelta la matriz int32
+    _, predecessors = dijkstra(matrix, directed=True, return_predecessors=True)
+    return predecessors.astype(np.int32, copy=False)
+
+
+def _routing_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: el proceso de la API tiene hilos y un fork podría heredar locks tomados
+            _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def build_routing_table(graph: "CSRGraph") -> RoutingTable:
+    """Ejecuta Dijkstra desde todos los nodos en el proceso auxiliar y conserva solo la matriz
+    de predecesores. Bloquea al hilo que la llama, pero no al GIL del proceso principal."""
+    global _executor
+    executor = _routing_executor()
+    try:
+        next_hop = executor.submit(_next_hop_matrix, graph.matrix).result()
+    except BrokenProcessPool:
+        # El proceso auxiliar murió: se descarta para crear otro en la siguiente construcción
+        with _executor_lock:
+            if _executor is executor:
+                _executor = None
+        raise
+    next_hop.setflags(write=False)
+    return RoutingTable(names=graph.names, index=graph.index, next_hop=next_hop)
@@ -0,0 +1,156 @@
+import fcntl
+import json
+import os
+import tempfile
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+from adapter.external.graph_file import read_graph_file, write_graph_file
+
+_LOCK_FILE = "leader.lock"
+_POINTER_FILE = "current.json"
+_REQUESTS_DIR = "requests"
+_TICKET_LOCK_FILE = "ticket.lock"
+_TICKET_FILE = "ticket"
+
+
+def _write_atomic(path: str, payload: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def _flocked(path: str) -> Iterator[None]:
+    """flock exclusivo (bloqueante) sobre `path` mientras dura el bloque."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+class SharedGraphChannel:
+    """Coordinación de los workers de uvicorn a través de un directorio compartido.
+
+    Conviene que el directorio esté en un tmpfs (p. ej. /dev/shm): los ficheros de
+    grafo viven entonces en memoria compartida y los workers los proyectan con mmap
+    de solo lectura sin copiarlos.
+
+    - `leader.lock`: el worker que obtiene el flock construye y publica el grafo.
+    - `graph-<sesión>-<versión>.bin`: cada versión exportada por el líder.
+    - `current.json`: puntero a la última versión y último ticket de solicitud aplicado.
+    - `requests/`: escrituras hechas en otros workers pendientes de aplicar por el líder.
+    - `ticket` / `ticket.lock`: contador de tickets de solicitud y su flock.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.session = uuid.uuid4().hex
+        self._lock_fd: Optional[int] = None
+        os.makedirs(os.path.join(directory, _REQUESTS_DIR), exist_ok=True)
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_fd is not None
+
+    def try_lead(self) -> bool:
+        """Intenta tomar el liderazgo sin bloquear; el flock se libera solo si el proceso muere."""
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.directory, _LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def publish(self, version: int, header: Mapping[str, Any], arrays: Mapping[str, np.ndarray], ticket: int) -> None:
+        """Escribe la versión y mueve el puntero; borra las anteriores salvo la inmediatamente previa
+        (los workers que aún la tengan proyectada siguen leyéndola aunque se desenlace)."""
+        file_name = f"graph-{self.session}-{version}.bin"
+        write_graph_file(os.path.join(self.directory, file_name), header, arrays)
+
+        previous = self.current()
+        pointer = {"session": self.session, "version": version, "file": file_name, "ticket": ticket}
+        _write_atomic(os.path.join(self.directory, _POINTER_FILE), json.dumps(pointer).encode())
+
+        keep = {file_name, previous.get("file") if previous else None}
+        for entry in os.listdir(self.directory):
+            if entry.startswith("graph-") and entry.endswith(".bin") and entry not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, entry))
+                except FileNotFoundError:
+                    pass
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """Puntero a la última versión publicada; None si aún no hay ninguna."""
+        try:
+            with open(os.path.join(self.directory, _POINTER_FILE), "rb") as f:
+                return json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def attach(self, pointer: Mapping[str, Any]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Proyecta la versión del puntero; los arrays son vistas de solo lectura sobre el fichero."""
+        return read_graph_file(os.path.join(self.directory, pointer["file"]), verify=False)
+
+    def _read_ticket(self) -> int:
+        try:
+            with open(os.path.join(self.directory, _TICKET_FILE), "rb") as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def submit(self, node_names: Optional[list[str]]) -> int:
+        """Deja una solicitud de refresco para el líder (None = completo) y devuelve su ticket.
+
+        El ticket sale de un contador bajo flock y se asigna con la solicitud ya visible en
+        el directorio: cuando el líder ve el ticket T, todas las de ticket menor ya están ahí.
+        """
+        with _flocked(os.path.join(self.directory, _TICKET_LOCK_FILE)):
+            ticket = self._read_ticket() + 1
+            path = os.path.join(self.directory, _REQUESTS_DIR, f"{ticket:020d}-{os.getpid()}.json")
+            _write_atomic(path, json.dumps({"names": node_names}).encode())
+            _write_atomic(os.path.join(self.directory, _TICKET_FILE), str(ticket).encode())
+        return ticket
+
+    def drain(self) -> Tuple[Set[str], bool, Optional[int]]:
+        """Recoge y elimina las solicitudes pendientes: (nombres, completo, último ticket)."""
+        directory = os.path.join(self.directory, _REQUESTS_DIR)
+        names: Set[str] = set()
+        full, last_ticket = False, None
+        # Se lista bajo el mismo flock que `submit`: no hay ninguna solicitud a medio escribir
+        with _flocked(os.path.join(self.directory, _TICKET_LOCK_FILE)):
+            entries = sorted(os.listdir(directory))
+        for entry in entries:
+            if entry.startswith("."):
+                continue
+            path = os.path.join(directory, entry)
+            try:
+                with open(path, "rb") as f:
+                    payload = f.read()
+                os.remove(path)
+                request = json.loads(payload)
+            except (FileNotFoundError, ValueError):
+                continue
+            if request.get("names") is None:
+                full = True
+            else:
+                names.update(request["names"])
+            ticket = int(entry.split("-", 1)[0])
+            last_ticket = ticket if last_ticket is None else max(last_ticket, ticket)
+        return names, full, last_ticket
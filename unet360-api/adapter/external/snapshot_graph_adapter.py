@@ -0,0 +1,1019 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from abc import abstractmethod
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Any, Callable, Collection, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+import bson
+import numpy as np
+from core.ports.graph_service_port import GraphServicePort
+from core.entities.graph_model import GraphAnalytics, GraphBridge, GraphPath, NodeView
+from adapter.database.node_repository import NodeRepository
+from adapter.external.graph_cache import MISSING, VersionedLRUCache
+from adapter.external.destination_trees import ShortestPathTree, resolve_hot_destinations
+from adapter.external.k_shortest_paths import KShortestPaths
+from adapter.external.graph_analytics import find_cut_elements
+from adapter.external.graph_components import ConnectedComponents
+from adapter.external.graph_file import (
+    GraphFileError, decode_strings, encode_strings, read_graph_file, write_graph_file
+)
+from adapter.external.shared_graph import SharedGraphChannel
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Campos de Node que necesita el grafo; el resto del documento no se lee
+_RECORD_FIELDS = (
+    "name", "adjacent_nodes", "minimap", "tags", "location",
+    "url_image", "forward_heading", "arrow_angles", "rotation_correction",
+)
+
+# La huella del contenido es la suma (módulo 2^128) de los resúmenes de cada documento:
+# no depende del orden de lectura y se actualiza restando y sumando los nodos cambiados
+_DIGEST_MODULUS = 1 << 128
+
+# Máximo de árboles de destinos frecuentes (una entrada `tag:valor` puede abarcar muchos nodos)
+_MAX_HOT_DESTINATIONS = 64
+
+
+def _declared_adjacency(node: Mapping[str, Any]) -> Dict[str, float]:
+    """Extrae {vecino: peso} de la lista posicional adjacent_nodes de un documento crudo de BD.
+
+    Las entradas pueden ser None o un dict {name: weight}; si un vecino aparece
+    varias veces se conserva la primera aparición.
+    """
+    declared: Dict[str, float] = {}
+    for adj in (node.get('adjacent_nodes') or []):
+        if not isinstance(adj, dict) or len(adj) != 1:
+            continue
+        (neighbor_name, weight), = adj.items()
+        if weight is None or neighbor_name in declared:
+            continue
+        declared[neighbor_name] = weight
+    return declared
+
+
+def _minimap_coordinates(node: Mapping[str, Any]) -> Optional[Tuple[str, float, float]]:
+    """(imagen, x, y) del minimapa; None si falta o tiene los valores por defecto."""
+    minimap = node.get('minimap') or {}
+    image, x, y = minimap.get('image'), minimap.get('x'), minimap.get('y')
+    if not image or not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+        return None
+    if image == 'missing.png' and x in (0, None) and y in (0, None):
+        return None
+    return image, float(x), float(y)
+
+
+def _arrow_headings(node: Mapping[str, Any]) -> Dict[str, float]:
+    """{vecino: ángulo de su flecha} emparejando adjacent_nodes y arrow_angles por posición."""
+    angles = node.get('arrow_angles') or []
+    headings: Dict[str, float] = {}
+    for i, adj in enumerate(node.get('adjacent_nodes') or []):
+        if not isinstance(adj, dict) or len(adj) != 1 or i >= len(angles) or angles[i] is None:
+            continue
+        neighbor_name = next(iter(adj))
+        headings.setdefault(neighbor_name, float(angles[i]))
+    return headings
+
+
+def _location_id(node: Mapping[str, Any]) -> Optional[str]:
+    """Id de la Location del nodo a partir del DBRef guardado por el Link."""
+    location_id = getattr(node.get('location'), 'id', None)
+    return str(location_id) if location_id is not None else None
+
+
+def _document_digest(document: Mapping[str, Any]) -> int:
+    """Resumen de 128 bits del documento crudo (BSON de la proyección con las claves ordenadas)."""
+    encoded = bson.encode(dict(sorted(document.items())))
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=16).digest(), "big")
+
+
+def _content_fingerprint(digests: Mapping[str, int]) -> Dict[str, Any]:
+    return {"count": len(digests), "digest": f"{sum(digests.values()) % _DIGEST_MODULUS:032x}"}
+
+
+def _tag_values(node: Mapping[str, Any]) -> Dict[str, Tuple[str, ...]]:
+    """{tag: (valores...)} a partir de Node.tags (dict {valor: heading} o lista de valores)."""
+    tags: Dict[str, Tuple[str, ...]] = {}
+    for tag_name, values in (node.get('tags') or {}).items():
+        if isinstance(values, dict):
+            tags[tag_name] = tuple(str(v) for v in values.keys())
+        elif isinstance(values, list):
+            tags[tag_name] = tuple(str(v) for v in values)
+        else:
+            tags[tag_name] = ()
+    return tags
+
+
+@dataclass(slots=True)
+class GraphNodeRecord:
+    """Proyección de un nodo de BD con los datos que usa el grafo."""
+    name: str
+    # Adyacencia declarada: {vecino: peso}
+    adjacency: Dict[str, float]
+    # (imagen del minimapa, x, y) si está configurado
+    coordinates: Optional[Tuple[str, float, float]] = None
+    # {tag: (valores...)}
+    tags: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    # Id de la Location (edificio/área) a la que pertenece
+    location: Optional[str] = None
+    # Datos del visor 360: imagen, orientación frontal, {vecino: ángulo de flecha} y {nodo de origen: grados}
+    url_image: Optional[str] = None
+    forward_heading: float = 0.0
+    arrow_headings: Dict[str, float] = field(default_factory=dict)
+    rotation_correction: Dict[str, int] = field(default_factory=dict)
+
+
+def _node_record(node: Mapping[str, Any]) -> GraphNodeRecord:
+    """Registro a partir del documento crudo con los campos de `_RECORD_FIELDS`."""
+    rotation_correction = node.get('rotation_correction')
+    return GraphNodeRecord(
+        name=node['name'],
+        adjacency=_declared_adjacency(node),
+        coordinates=_minimap_coordinates(node),
+        tags=_tag_values(node),
+        location=_location_id(node),
+        url_image=node.get('url_image'),
+        forward_heading=float(node.get('forward_heading') or 0.0),
+        arrow_headings=_arrow_headings(node),
+        # Igual que el validador del modelo: un número suelto de datos antiguos no es una corrección por origen
+        rotation_correction=dict(rotation_correction) if isinstance(rotation_correction, dict) else {},
+    )
+
+
+def _reciprocal_edges(records: Mapping[str, GraphNodeRecord], names: Iterable[str]) -> set[tuple[str, str, float]]:
+    """Aristas válidas que tocan a `names`: A->B y B->A existen y el peso coincide."""
+    valid_edges: set[tuple[str, str, float]] = set()
+    for name in names:
+        record = records.get(name)
+        if record is None:
+            continue
+        for neighbor_name, weight in record.adjacency.items():
+            back = records.get(neighbor_name)
+            if back is None or back.adjacency.get(name) != weight:
+                continue
+            # Evitar duplicados con ordenación de extremos
+            u, v = sorted((name, neighbor_name))
+            valid_edges.add((u, v, float(weight)))
+    return valid_edges
+
+
+# Versión del contenido de la copia en disco; las de otra versión se descartan al arrancar
+_STATE_SCHEMA = 3
+
+
+def _export_state(records: Mapping[str, GraphNodeRecord]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Serializa la proyección y sus aristas válidas como arrays con nombres internados.
+
+    Devuelve los atributos sin forma de array (coordenadas y tags) aparte, para la cabecera.
+    """
+    names = list(records)
+    index = {name: i for i, name in enumerate(names)}
+    for record in records.values():
+        for neighbor_name in record.adjacency:
+            if neighbor_name not in index:
+                index[neighbor_name] = len(names)
+                names.append(neighbor_name)
+
+    adjacency_ptr = np.zeros(len(records) + 1, dtype=np.int64)
+    np.cumsum([len(record.adjacency) for record in records.values()], out=adjacency_ptr[1:])
+    edges = sorted(_reciprocal_edges(records, records.keys()))
+    name_offsets, name_data = encode_strings(names)
+    arrays = {
+        "name_offsets": name_offsets,
+        "name_data": name_data,
+        "adjacency_ptr": adjacency_ptr,
+        "adjacency_ids": np.fromiter(
+            (index[n] for record in records.values() for n in record.adjacency), dtype=np.int32
+        ),
+        "adjacency_weights": np.fromiter(
+            (w for record in records.values() for w in record.adjacency.values()), dtype=np.float64
+        ),
+        "edge_u": np.fromiter((index[u] for u, _, _ in edges), dtype=np.int32, count=len(edges)),
+        "edge_v": np.fromiter((index[v] for _, v, _ in edges), dtype=np.int32, count=len(edges)),
+        "edge_weights": np.fromiter((w for _, _, w in edges), dtype=np.float64, count=len(edges)),
+    }
+    header = {"schema": _STATE_SCHEMA, "records": len(records), "attributes": _record_attributes(records)}
+    return header, arrays
+
+
+def _record_attributes(records: Mapping[str, GraphNodeRecord], names: Optional[Collection[str]] = None) -> Dict[str, dict]:
+    """Atributos sin forma de array (coordenadas, tags y datos del visor) de cada registro."""
+    return {
+        name: {
+            "coordinates": record.coordinates,
+            "tags": record.tags,
+            "location": record.location,
+            "url_image": record.url_image,
+            "forward_heading": record.forward_heading,
+            "arrow_headings": record.arrow_headings,
+            "rotation_correction": record.rotation_correction,
+        }
+        for name, record in records.items()
+        if names is None or name in names
+    }
+
+
+def _record_from_attributes(name: str, adjacency: Dict[str, float], attributes: Mapping[str, Any]) -> GraphNodeRecord:
+    coordinates = attributes.get("coordinates")
+    return GraphNodeRecord(
+        name=name,
+        adjacency=adjacency,
+        coordinates=tuple(coordinates) if coordinates is not None else None,
+        tags={tag: tuple(values) for tag, values in attributes.get("tags", {}).items()},
+        location=attributes.get("location"),
+        url_image=attributes.get("url_image"),
+        forward_heading=attributes.get("forward_heading", 0.0),
+        arrow_headings=attributes.get("arrow_headings", {}),
+        rotation_correction=attributes.get("rotation_correction", {}),
+    )
+
+
+def _import_state(header: Mapping[str, Any], arrays: Mapping[str, np.ndarray]) -> Tuple[Dict[str, GraphNodeRecord], List[Tuple[str, str, float]]]:
+    """Inverso de `_export_state`: (proyección, aristas válidas)."""
+    names = decode_strings(arrays["name_offsets"], arrays["name_data"])
+    bounds = arrays["adjacency_ptr"].tolist()
+    adjacency_ids = arrays["adjacency_ids"].tolist()
+    adjacency_weights = arrays["adjacency_weights"].tolist()
+    attributes = header["attributes"]
+
+    records: Dict[str, GraphNodeRecord] = {}
+    for i, name in enumerate(names[:header["records"]]):
+        start, end = bounds[i], bounds[i + 1]
+        records[name] = _record_from_attributes(
+            name,
+            {names[j]: w for j, w in zip(adjacency_ids[start:end], adjacency_weights[start:end])},
+            attributes.get(name, {}),
+        )
+    edges = [
+        (names[u], names[v], w)
+        for u, v, w in zip(arrays["edge_u"].tolist(), arrays["edge_v"].tolist(), arrays["edge_weights"].tolist())
+    ]
+    return records, edges
+
+
+TagIndex = Mapping[str, Mapping[Optional[str], FrozenSet[str]]]
+
+
+def _build_tag_index(records: Mapping[str, GraphNodeRecord], graph_nodes: Collection[str]) -> TagIndex:
+    """{tag: {valor: nodos}} de los nodos presentes en el grafo; la clave None agrupa todos los del tag."""
+    index: Dict[str, Dict[Optional[str], set]] = {}
+    for name, record in records.items():
+        if name not in graph_nodes:
+            continue
+        for tag_name, values in record.tags.items():
+            by_value = index.setdefault(tag_name, {})
+            by_value.setdefault(None, set()).add(name)
+            for value in values:
+                by_value.setdefault(value, set()).add(name)
+    return MappingProxyType({
+        tag_name: MappingProxyType({value: frozenset(names) for value, names in by_value.items()})
+        for tag_name, by_value in index.items()
+    })
+
+
+def _patch_tag_index(
+    index: TagIndex,
+    previous: Mapping[str, GraphNodeRecord],
+    previous_nodes: Collection[str],
+    records: Mapping[str, GraphNodeRecord],
+    graph_nodes: Collection[str],
+    touched: Iterable[str],
+) -> TagIndex:
+    """Índice de la versión anterior corregido solo para los nodos `touched` (cambiados o que
+    han entrado o salido del grafo); los conjuntos que no cambian se reutilizan."""
+    changes: Dict[str, Dict[Optional[str], Tuple[set, set]]] = {}
+    for name in touched:
+        before = previous[name].tags if name in previous_nodes and name in previous else {}
+        after = records[name].tags if name in graph_nodes and name in records else {}
+        if before == after:
+            continue
+        for tags, side in ((before, 0), (after, 1)):
+            for tag_name, values in tags.items():
+                by_value = changes.setdefault(tag_name, {})
+                for value in (None, *values):
+                    by_value.setdefault(value, (set(), set()))[side].add(name)
+    if not changes:
+        return index
+
+    patched = dict(index)
+    for tag_name, by_value in changes.items():
+        values = dict(patched.get(tag_name, {}))
+        for value, (removed, added) in by_value.items():
+            names = (values.get(value, frozenset()) - removed) | added
+            if names:
+                values[value] = frozenset(names)
+            else:
+                values.pop(value, None)
+        if values:
+            patched[tag_name] = MappingProxyType(values)
+        else:
+            patched.pop(tag_name, None)
+    return MappingProxyType(patched)
+
+
+@dataclass(frozen=True)
+class _EdgeChanges:
+    """Cambio incremental a publicar: nodos afectados y aristas (u, v) quitadas y añadidas."""
+    touched: FrozenSet[str]
+    removed: FrozenSet[Tuple[str, str]]
+    added: FrozenSet[Tuple[str, str]]
+
+
+@dataclass(frozen=True)
+class GraphSnapshot:
+    """Versión inmutable del grafo publicada para las lecturas.
+
+    `graph` es la representación propia de cada motor (nx.Graph, arrays CSR...);
+    `records` es la proyección de todos los nodos de BD de esa versión,
+    `tag_index` el índice tag -> valor -> nodos del grafo, `components` el id de
+    componente conexa de cada nodo del grafo (pertenencia y alcanzabilidad en O(1))
+    y `source_fingerprint` la huella del contenido de los documentos leídos.
+    """
+    version: int
+    graph: Any
+    records: Mapping[str, GraphNodeRecord] = field(default_factory=dict)
+    tag_index: TagIndex = field(default_factory=dict)
+    components: Mapping[str, int] = field(default_factory=dict)
+    source_fingerprint: Optional[Mapping[str, Any]] = None
+
+
+class SnapshotGraphService(GraphServicePort):
+    """Base común de los motores de grafo: mantiene la proyección de los nodos de BD,
+    deriva las aristas recíprocas (completa o incrementalmente) y publica cada
+    versión como un snapshot inmutable con un único cambio de referencia.
+
+    Cada motor implementa `_build_graph` (su representación de lectura) y las
+    consultas sobre ella.
+    """
+    _instance = None
+
+    # Los motores que pueden compartir su grafo entre workers (GRAPH_SHARED_DIR) lo activan
+    # e implementan `_graph_arrays` y `_graph_from_arrays`
+    supports_shared_graph = False
+
+    def __new__(cls, node_repository: NodeRepository):
+        """Implementación del patrón para asegurar una única instancia por motor."""
+        if cls._instance is None:
+            instance = super(SnapshotGraphService, cls).__new__(cls)
+            instance.node_repository = node_repository
+            instance._write_lock = asyncio.Lock()
+            # Proyección de los nodos de BD: {name: GraphNodeRecord}
+            instance._records = {}
+            # Aristas válidas (recíprocas con igual peso) en ambos sentidos: {name: {vecino: peso}}
+            instance._edges = {}
+            # Componentes conexas de `_edges`, mantenidas con cada cambio incremental (None = recalcular)
+            instance._components = None
+            instance._snapshot = GraphSnapshot(version=0, graph=instance._build_graph({}))
+            # Caminos calculados por (origen, destino) de la versión vigente
+            instance._path_cache = VersionedLRUCache(int(os.getenv("GRAPH_PATH_CACHE_SIZE", "1024")))
+            # Búsquedas de Yen reanudables por (origen, destino) de la versión vigente
+            instance._k_paths_cache = VersionedLRUCache(int(os.getenv("GRAPH_K_PATHS_CACHE_SIZE", "256")))
+            # Campos de distancia por (origen, peso máximo) de la versión vigente
+            instance._distance_cache = VersionedLRUCache(int(os.getenv("GRAPH_DISTANCE_CACHE_SIZE", "128")))
+            # Estructuras derivadas que se construyen en segundo plano: {nombre: (versión, valor)}
+            instance._derived = {}
+            instance._derived_tasks = {}
+            # (versión, tarea) del último análisis de puentes y articulaciones
+            instance._analytics = None
+            # Destinos frecuentes con árbol de caminos precalculado: nombres de nodo o `tag:valor`
+            instance.hot_destinations = [
+                entry.strip() for entry in os.getenv("GRAPH_HOT_DESTINATIONS", "").split(",") if entry.strip()
+            ]
+            # Copia en disco para arranques en caliente (vacío la desactiva)
+            instance.snapshot_path = os.getenv("GRAPH_SNAPSHOT_PATH", "")
+            instance._restored_version = None
+            # Resumen de cada documento leído ({name: int}), para la huella de la copia en disco
+            instance._document_digests = {}
+            # Grafo compartido entre workers de uvicorn (vacío lo desactiva)
+            instance.shared_dir = os.getenv("GRAPH_SHARED_DIR", "")
+            instance.shared_poll_seconds = float(os.getenv("GRAPH_SHARED_POLL_SECONDS", "0.2"))
+            instance.shared_wait_seconds = float(os.getenv("GRAPH_SHARED_WAIT_SECONDS", "30"))
+            instance._shared = None
+            instance._shared_task = None
+            instance._shared_pointer = None
+            # Se llama cuando un seguidor asume el liderazgo (p. ej. para arrancar la reconciliación)
+            instance._on_promoted = None
+            # Líder: solicitudes de otros workers ya aplicadas [(versión, ticket)] y última exportación
+            instance._shared_applied = []
+            instance._shared_exported = None
+            instance._shared_export_lock = threading.Lock()
+            cls._instance = instance
+        return cls._instance
+
+    @property
+    def version(self) -> int:
+        """Versión monótona del grafo publicado."""
+        return self._snapshot.version
+
+    @abstractmethod
+    def _build_graph(self, edges: Dict[str, Dict[str, float]]) -> Any:
+        """Construye la representación de lectura del motor a partir de las aristas válidas."""
+        pass
+
+    @abstractmethod
+    def _compute_shortest_path(self, snapshot: GraphSnapshot, source: str, target: str) -> Optional[GraphPath]:
+        """Camino más corto sobre la versión indicada; None si no existe."""
+        pass
+
+    @abstractmethod
+    def _weighted_neighbors(self, snapshot: GraphSnapshot) -> Callable[[str], Mapping[str, float]]:
+        """Función nodo -> {vecino: peso} sobre la versión indicada."""
+        pass
+
+    @abstractmethod
+    def _shortest_path_tree(self, snapshot: GraphSnapshot, root: str) -> ShortestPathTree:
+        """Árbol de caminos más cortos de todos los nodos hacia `root`."""
+        pass
+
+    @abstractmethod
+    def _component_index(self, graph: Any) -> Dict[str, int]:
+        """{nodo: id de componente conexa} de la representación del motor."""
+        pass
+
+    def _derived_builders(self) -> Dict[str, Callable[[GraphSnapshot], Any]]:
+        """Estructuras opcionales a precalcular en un hilo tras cada publicación: {nombre: builder}."""
+        builders = {}
+        if self.hot_destinations:
+            builders["destination_trees"] = self._build_destination_trees
+        if self.snapshot_path:
+            builders["disk_snapshot"] = self._persist_snapshot
+        if self._shared is not None and self._shared.is_leader:
+            builders["shared_graph"] = self._export_shared
+        return builders
+
+    def _build_destination_trees(self, snapshot: GraphSnapshot) -> Dict[str, ShortestPathTree]:
+        """Un árbol hacia cada destino frecuente presente en la versión."""
+        destinations = resolve_hot_destinations(self.hot_destinations, snapshot.tag_index, snapshot.components)
+        if len(destinations) > _MAX_HOT_DESTINATIONS:
+            logger.warning(
+                "GRAPH_HOT_DESTINATIONS resolves to %s nodes; only the first %s get a tree",
+                len(destinations), _MAX_HOT_DESTINATIONS,
+            )
+            destinations = destinations[:_MAX_HOT_DESTINATIONS]
+        return {root: self._shortest_path_tree(snapshot, root) for root in destinations}
+
+    def _tree_path(self, snapshot: GraphSnapshot, source: str, target: str) -> Optional[GraphPath]:
+        """Camino leído del árbol del destino (o del origen, invertido: el grafo es no dirigido)."""
+        trees = self._derived_for("destination_trees", snapshot)
+        if not trees:
+            return None
+        tree = trees.get(target)
+        if tree is not None:
+            return tree.path_from(source)
+        tree = trees.get(source)
+        if tree is not None:
+            path = tree.path_from(target)
+            return GraphPath(nodes=path.nodes[::-1], total_weight=path.total_weight) if path else None
+        return None
+
+    def _persist_snapshot(self, snapshot: GraphSnapshot) -> Optional[str]:
+        """Vuelca la versión a disco; se omite si no hay huella o si se acaba de cargar de ese fichero."""
+        if snapshot.source_fingerprint is None or snapshot.version == self._restored_version:
+            return None
+        header, arrays = _export_state(snapshot.records)
+        header.update({
+            "fingerprint": dict(snapshot.source_fingerprint),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+        write_graph_file(self.snapshot_path, header, arrays)
+        return self.snapshot_path
+
+    def _track_document(self, name: str, document: Optional[Mapping[str, Any]]) -> None:
+        """Actualiza el resumen del nodo con el documento leído (None = ya no existe)."""
+        if not self.snapshot_path:
+            return
+        if document is None:
+            self._document_digests.pop(name, None)
+        else:
+            self._document_digests[name] = _document_digest(document)
+
+    def _source_fingerprint(self) -> Optional[Dict[str, Any]]:
+        """Huella de lo leído de BD: cambia con cualquier edición de los campos que usa el grafo,
+        aunque no cambie el tamaño de la colección. None si no hay copia en disco."""
+        if not self.snapshot_path:
+            return None
+        return _content_fingerprint(self._document_digests)
+
+    async def load_persisted_graph(self) -> bool:
+        """Publica el grafo guardado en disco si su huella coincide con la de la colección.
+
+        Devuelve False (y no cambia nada) si no hay copia, está dañada o es obsoleta;
+        en ese caso hay que hacer un `refresh_graph` completo.
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        # Se lee la proyección y se resume cada documento: la copia solo vale si el contenido es idéntico
+        digests = {}
+        try:
+            async for document in self.node_repository.stream_projection(_RECORD_FIELDS):
+                digests[document["name"]] = _document_digest(document)
+        except Exception:
+            logger.exception("Failed to read the node collection fingerprint")
+            return False
+        fingerprint = _content_fingerprint(digests)
+        try:
+            header, arrays = await asyncio.to_thread(read_graph_file, self.snapshot_path)
+            if header.get("schema") != _STATE_SCHEMA or header.get("fingerprint") != fingerprint:
+                logger.info("Graph snapshot '%s' is stale; a full rebuild is needed", self.snapshot_path)
+                return False
+            records, edges = await asyncio.to_thread(_import_state, header, arrays)
+        except (GraphFileError, KeyError, ValueError) as e:
+            logger.warning("Ignoring graph snapshot '%s': %s", self.snapshot_path, e)
+            return False
+
+        async with self._write_lock:
+            self._records = records
+            self._document_digests = digests
+            self._edges = {}
+            for u, v, w in edges:
+                self._add_edge(u, v, w)
+            self._restored_version = self._snapshot.version + 1
+            await self._publish(fingerprint)
+        logger.info("Graph restored from '%s' (%s nodes)", self.snapshot_path, len(self._edges))
+        return True
+
+    def _derived_for(self, name: str, snapshot: GraphSnapshot) -> Any:
+        """Estructura derivada `name` si ya está construida para esa versión; None en otro caso."""
+        entry = self._derived.get(name)
+        if entry is None or entry[0] != snapshot.version:
+            return None
+        return entry[1]
+
+    def _schedule_derived(self) -> None:
+        for name in self._derived_builders():
+            task = self._derived_tasks.get(name)
+            if task is None or task.done():
+                self._derived_tasks[name] = asyncio.create_task(self._derive_latest(name))
+
+    async def _derive_latest(self, name: str) -> None:
+        # Un único hilo por estructura: si se publicó otra versión mientras se construía, se repite con la última
+        while True:
+            snapshot = self._snapshot
+            entry = self._derived.get(name)
+            if entry is not None and entry[0] == snapshot.version:
+                return
+            builder = self._derived_builders().get(name)
+            if builder is None:
+                return
+            try:
+                value = await asyncio.to_thread(builder, snapshot)
+            except Exception:
+                logger.exception("Failed to build graph structure '%s' for version %s", name, snapshot.version)
+                return
+            self._derived[name] = (snapshot.version, value)
+
+    @property
+    def _is_follower(self) -> bool:
+        return self._shared is not None and not self._shared.is_leader
+
+    async def join_shared_graph(self, on_promoted: Optional[Callable[[], None]] = None) -> bool:
+        """Entra en el grafo compartido entre workers si GRAPH_SHARED_DIR está configurado.
+
+        El worker que obtiene el liderazgo devuelve False y construye el grafo como
+        siempre, exportando cada versión. El resto devuelve True: proyectan la última
+        versión publicada, la siguen en segundo plano y reenvían sus escrituras al líder.
+        Si un seguidor asume después el liderazgo, se llama a `on_promoted`.
+        """
+        if not self.shared_dir or self._shared is not None:
+            return self._is_follower
+        if not self.supports_shared_graph:
+            logger.warning("%s cannot share its graph between workers; GRAPH_SHARED_DIR is ignored", type(self).__name__)
+            return False
+
+        self._shared = SharedGraphChannel(self.shared_dir)
+        if self._shared.try_lead():
+            logger.info("Graph leader for '%s' (pid %s)", self.shared_dir, os.getpid())
+            self._shared_task = asyncio.create_task(self._lead_loop())
+            return False
+
+        self._on_promoted = on_promoted
+        self._shared_task = asyncio.create_task(self._follow_loop())
+        try:
+            await self._wait_for_shared(ticket=0)
+        except TimeoutError as e:
+            logger.warning("%s; the graph will be attached when it is published", e)
+        return True
+
+    async def leave_shared_graph(self) -> None:
+        """Detiene el seguimiento o la exportación y libera el liderazgo."""
+        task, self._shared_task = self._shared_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._shared is not None:
+            self._shared.release()
+            self._shared = None
+        self._on_promoted = None
+
+    def _export_shared(self, snapshot: GraphSnapshot) -> Optional[int]:
+        """Exporta la versión para los demás workers con el último ticket que ya incluye.
+
+        Puede llamarse desde varios hilos: nunca mueve el puntero hacia atrás.
+        """
+        with self._shared_export_lock:
+            floor = self._shared_exported[1] if self._shared_exported else 0
+            ticket = max([floor] + [t for v, t in self._shared_applied if v <= snapshot.version])
+            last = self._shared_exported
+            if last is not None and (snapshot.version < last[0] or (snapshot.version == last[0] and ticket <= last[1])):
+                return None
+
+            names, arrays = self._graph_arrays(snapshot.graph)
+            name_offsets, name_data = encode_strings(names)
+            header = {"attributes": _record_attributes(snapshot.records, frozenset(names))}
+            self._shared.publish(
+                snapshot.version, header, {"name_offsets": name_offsets, "name_data": name_data, **arrays}, ticket
+            )
+            self._shared_exported = (snapshot.version, ticket)
+            self._shared_applied = [(v, t) for v, t in self._shared_applied if v > snapshot.version]
+            return snapshot.version
+
+    async def _lead_loop(self) -> None:
+        """Aplica las escrituras que otros workers dejan en el directorio compartido."""
+        while True:
+            await asyncio.sleep(self.shared_poll_seconds)
+            ticket = None
+            try:
+                names, full, ticket = await asyncio.to_thread(self._shared.drain)
+                if ticket is None:
+                    continue
+                if full:
+                    await self.refresh_graph()
+                else:
+                    await self.apply_node_changes(names)
+            except Exception:
+                logger.exception("Failed to apply graph changes requested by another worker")
+                if ticket is None:
+                    continue
+            # Se marca aplicada aunque falle: los workers que esperan no deben quedarse colgados
+            with self._shared_export_lock:
+                self._shared_applied.append((self._snapshot.version, ticket))
+            await asyncio.to_thread(self._export_shared, self._snapshot)
+
+    async def _follow_loop(self) -> None:
+        """Sigue el puntero del líder y asume el liderazgo si el líder desaparece."""
+        while True:
+            await asyncio.sleep(self.shared_poll_seconds)
+            try:
+                if self._shared.try_lead():
+                    logger.info("Taking over as graph leader for '%s' (pid %s)", self.shared_dir, os.getpid())
+                    await self.refresh_graph()
+                    self._shared_task = asyncio.create_task(self._lead_loop())
+                    if self._on_promoted is not None:
+                        self._on_promoted()
+                    return
+                pointer = await asyncio.to_thread(self._shared.current)
+                if pointer is not None:
+                    await self._attach_shared(pointer)
+            except Exception:
+                logger.exception("Failed to follow the shared graph")
+
+    async def _wait_for_shared(self, ticket: int) -> None:
+        """Espera a que el líder publique una versión que incluya `ticket` y la proyecta."""
+        deadline = time.monotonic() + self.shared_wait_seconds
+        while True:
+            pointer = await asyncio.to_thread(self._shared.current)
+            if pointer is not None and pointer["ticket"] >= ticket:
+                await self._attach_shared(pointer)
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"The graph leader did not publish within {self.shared_wait_seconds}s")
+            await asyncio.sleep(self.shared_poll_seconds)
+
+    async def _attach_shared(self, pointer: Mapping[str, Any]) -> None:
+        """Publica localmente la versión del líder sobre los arrays proyectados con mmap."""
+        async with self._write_lock:
+            current = self._shared_pointer
+            if current is not None and (current["session"], current["version"]) == (pointer["session"], pointer["version"]):
+                return
+            try:
+                snapshot = await asyncio.to_thread(self._shared_snapshot, pointer)
+            except GraphFileError:
+                # El líder ya la sustituyó: se tomará la siguiente en la próxima vuelta
+                return
+            # Versión local monótona (las del líder vuelven a empezar si cambia de sesión)
+            self._snapshot = replace(snapshot, version=self._snapshot.version + 1)
+            self._shared_pointer = dict(pointer)
+            self._schedule_derived()
+
+    def _shared_snapshot(self, pointer: Mapping[str, Any]) -> GraphSnapshot:
+        header, arrays = self._shared.attach(pointer)
+        names = decode_strings(arrays["name_offsets"], arrays["name_data"])
+        records = {
+            name: _record_from_attributes(name, {}, attributes)
+            for name, attributes in header["attributes"].items()
+        }
+        graph = self._graph_from_arrays(names, arrays)
+        return GraphSnapshot(
+            version=0,
+            graph=graph,
+            records=MappingProxyType(records),
+            tag_index=_build_tag_index(records, frozenset(names)),
+            components=MappingProxyType(self._component_index(graph)),
+        )
+
+    def has_node(self, node_name: str) -> bool:
+        """Indica en O(1) si el nodo está en el grafo publicado."""
+        return node_name in self._snapshot.components
+
+    def are_connected(self, source: str, target: str) -> bool:
+        """Indica en O(1) si existe algún camino entre dos nodos del grafo publicado."""
+        return self._connected(self._snapshot, source, target)
+
+    @staticmethod
+    def _connected(snapshot: GraphSnapshot, source: str, target: str) -> bool:
+        component = snapshot.components.get(source)
+        return component is not None and component == snapshot.components.get(target)
+
+    def get_node_views(self, node_names: Iterable[str]) -> Dict[str, NodeView]:
+        """Datos del visor de los nodos indicados desde la proyección en memoria (sin consultar BD)."""
+        records = self._snapshot.records
+        views = {}
+        for name in node_names:
+            record = records.get(name)
+            if record is not None and name not in views:
+                views[name] = NodeView(
+                    name=name,
+                    url_image=record.url_image,
+                    forward_heading=record.forward_heading,
+                    arrow_headings=record.arrow_headings,
+                    rotation_correction=record.rotation_correction,
+                )
+        return views
+
+    async def get_shortest_path(self, source: str, target: str) -> Optional[GraphPath]:
+        """Calcula el camino más corto entre dos nodos, reutilizando la caché de la versión vigente."""
+        # Una sola lectura de la referencia: toda la consulta usa la misma versión
+        return self._cached_shortest_path(self._snapshot, source, target)
+
+    def _cached_shortest_path(self, snapshot: GraphSnapshot, source: str, target: str) -> Optional[GraphPath]:
+        if not self._connected(snapshot, source, target):
+            return None
+        # Los destinos frecuentes se responden siguiendo punteros, sin pasar por la caché
+        path = self._tree_path(snapshot, source, target)
+        if path is not None:
+            return path
+        path = self._path_cache.get(snapshot.version, (source, target))
+        if path is MISSING:
+            path = self._compute_shortest_path(snapshot, source, target)
+            self._path_cache.put(snapshot.version, (source, target), path)
+        return path
+
+    async def get_k_shortest_paths(self, source: str, target: str, k: int) -> List[GraphPath]:
+        """Hasta `k` caminos sin ciclos (Yen) entre dos nodos, del más corto al más largo.
+
+        El estado de la búsqueda se guarda por par en la versión vigente: repetir la
+        consulta o pedir más alternativas continúa donde se quedó.
+        """
+        snapshot = self._snapshot
+        if k <= 0 or not self._connected(snapshot, source, target):
+            return []
+        search = self._k_paths_cache.get(snapshot.version, (source, target))
+        if search is MISSING:
+            first = self._cached_shortest_path(snapshot, source, target)
+            search = KShortestPaths(
+                self._weighted_neighbors(snapshot), source, target,
+                (first.total_weight, first.nodes) if first is not None else None,
+            )
+            self._k_paths_cache.put(snapshot.version, (source, target), search)
+        routes = await asyncio.to_thread(search.take, k)
+        return [GraphPath(nodes=nodes, total_weight=weight) for weight, nodes in routes]
+
+    @abstractmethod
+    def _compute_paths_from(self, snapshot: GraphSnapshot, source: str, targets: List[str]) -> Dict[str, Optional[GraphPath]]:
+        """Caminos desde `source` a cada destino con una única búsqueda; None para los inalcanzables."""
+        pass
+
+    async def get_shortest_paths_from(self, source: str, targets: Iterable[str]) -> Dict[str, Optional[GraphPath]]:
+        """Caminos desde un origen a varios destinos: los que no están en caché se resuelven
+        con una sola búsqueda en un hilo, para no bloquear el bucle con lotes grandes."""
+        snapshot = self._snapshot
+        paths: Dict[str, Optional[GraphPath]] = {}
+        missing = []
+        for target in dict.fromkeys(targets):
+            # Los destinos de otra componente (o desconocidos) no necesitan búsqueda
+            if not self._connected(snapshot, source, target):
+                paths[target] = None
+                continue
+            path = self._tree_path(snapshot, source, target)
+            if path is not None:
+                paths[target] = path
+                continue
+            path = self._path_cache.get(snapshot.version, (source, target))
+            if path is MISSING:
+                missing.append(target)
+            else:
+                paths[target] = path
+        if missing:
+            computed = await asyncio.to_thread(self._compute_paths_from, snapshot, source, missing)
+            for target, path in computed.items():
+                self._path_cache.put(snapshot.version, (source, target), path)
+            paths.update(computed)
+        return paths
+
+    @abstractmethod
+    def _compute_distances(self, snapshot: GraphSnapshot, source: str, max_weight: Optional[float]) -> Dict[str, float]:
+        """Distancia desde `source` a cada nodo alcanzable (sin superar `max_weight` si se indica)."""
+        pass
+
+    async def get_distances(self, source: str, max_weight: Optional[float] = None) -> Mapping[str, float]:
+        """Campo de distancias desde un origen con una única búsqueda en un hilo, cacheado por
+        (origen, peso máximo) en la versión vigente."""
+        snapshot = self._snapshot
+        if source not in snapshot.components:
+            return {}
+        key = (source, max_weight)
+        distances = self._distance_cache.get(snapshot.version, key)
+        if distances is MISSING:
+            distances = MappingProxyType(
+                await asyncio.to_thread(self._compute_distances, snapshot, source, max_weight)
+            )
+            self._distance_cache.put(snapshot.version, key, distances)
+        return distances
+
+    @abstractmethod
+    def _nearest_targets(self, snapshot: GraphSnapshot, source: str, targets: FrozenSet[str], limit: int) -> List[GraphPath]:
+        """Búsqueda única desde `source` que se detiene al alcanzar los `limit` destinos más cercanos."""
+        pass
+
+    async def get_nearest_tagged(self, source: str, tag: str, value: Optional[str] = None, limit: int = 1) -> List[GraphPath]:
+        """Caminos a los `limit` nodos más cercanos que tienen el tag (y valor) indicado, del más cercano al más lejano."""
+        snapshot = self._snapshot
+        targets = snapshot.tag_index.get(tag, {}).get(value)
+        if not targets or limit <= 0:
+            return []
+        return self._nearest_targets(snapshot, source, targets, limit)
+
+    def _analyze(self, snapshot: GraphSnapshot) -> GraphAnalytics:
+        bridges, articulation = find_cut_elements(snapshot.components, self._weighted_neighbors(snapshot))
+        bridges.sort(key=lambda bridge: (-bridge[2], bridge[0], bridge[1]))
+        return GraphAnalytics(
+            version=snapshot.version,
+            component_sizes=sorted(Counter(snapshot.components.values()).values(), reverse=True),
+            bridges=[GraphBridge(nodes=(u, v), separated_nodes=separated) for u, v, separated in bridges],
+            articulation_points=sorted(articulation),
+        )
+
+    async def get_graph_analytics(self) -> GraphAnalytics:
+        """Puentes, puntos de articulación y tamaños de componente de la versión vigente.
+
+        Se calcula una sola vez por versión en un hilo; las peticiones concurrentes
+        esperan al mismo cálculo y las siguientes reciben el resultado guardado.
+        """
+        snapshot = self._snapshot
+        entry = self._analytics
+        if entry is None or entry[0] != snapshot.version:
+            entry = (snapshot.version, asyncio.ensure_future(asyncio.to_thread(self._analyze, snapshot)))
+            self._analytics = entry
+        try:
+            return await asyncio.shield(entry[1])
+        except Exception:
+            # No se guarda un fallo: la siguiente petición lo reintenta
+            if self._analytics is entry:
+                self._analytics = None
+            raise
+
+    def get_cache_stats(self) -> Dict[str, dict]:
+        """Contadores de las cachés del motor para monitorización."""
+        return {
+            "shortest_path": self._path_cache.stats(),
+            "k_shortest_paths": self._k_paths_cache.stats(),
+            "distances": self._distance_cache.stats(),
+        }
+
+    async def _publish(self, fingerprint: Optional[Mapping[str, Any]] = None, changes: Optional[_EdgeChanges] = None) -> None:
+        """Construye la versión en un hilo y la publica con un único cambio de referencia.
+
+        Debe llamarse con `_write_lock` tomado: la versión es monótona y nadie modifica
+        `_records` ni `_edges` mientras el hilo los lee. Con `changes` el índice de tags y
+        las componentes se corrigen solo para los nodos afectados.
+        """
+        build = asyncio.ensure_future(asyncio.to_thread(self._build_snapshot, fingerprint, changes))
+        try:
+            snapshot = await asyncio.shield(build)
+        except BaseException:
+            # Si se cancela, el hilo sigue leyendo el estado de escritura: se espera antes de soltar el lock
+            await asyncio.wait({build})
+            self._components = None
+            raise
+        self._snapshot = snapshot
+        self._schedule_derived()
+
+    def _build_snapshot(self, fingerprint: Optional[Mapping[str, Any]], changes: Optional[_EdgeChanges]) -> GraphSnapshot:
+        previous = self._snapshot
+        graph = self._build_graph(self._edges)
+        if changes is None or self._components is None:
+            self._components = ConnectedComponents(self._component_index(graph))
+            tag_index = _build_tag_index(self._records, self._edges)
+        else:
+            self._components.update(self._edges, changes.removed, changes.added)
+            tag_index = _patch_tag_index(
+                previous.tag_index, previous.records, previous.components, self._records, self._edges, changes.touched
+            )
+        return GraphSnapshot(
+            version=previous.version + 1,
+            graph=graph,
+            records=MappingProxyType(dict(self._records)),
+            tag_index=tag_index,
+            components=MappingProxyType(dict(self._components.labels)),
+            source_fingerprint=fingerprint,
+        )
+
+    def _add_edge(self, u: str, v: str, weight: float) -> None:
+        self._edges.setdefault(u, {})[v] = weight
+        self._edges.setdefault(v, {})[u] = weight
+
+    async def refresh_graph(self) -> None:
+        """Refresca el grafo cargando aristas solo si hay adyacencia recíproca con igual peso.
+
+        - Lee de BD solo los campos que usa el grafo, como dicts crudos y en lotes.
+        - Construye aristas únicamente cuando A->B y B->A existen y el peso coincide.
+        - Excluye del grafo los nodos que no participan en ninguna arista válida.
+        - El grafo nuevo se construye aparte y se publica de forma atómica.
+        - En un worker seguidor la reconstrucción se delega al líder.
+        """
+        if self._is_follower:
+            await self._wait_for_shared(await asyncio.to_thread(self._shared.submit, None))
+            return
+
+        async with self._write_lock:
+            # Si la lectura falla a medias, el siguiente cambio incremental no puede partir de la versión publicada
+            self._components = None
+            self._records = {}
+            self._document_digests = {}
+            async for document in self.node_repository.stream_projection(_RECORD_FIELDS):
+                record = _node_record(document)
+                self._records[record.name] = record
+                # La huella sale de los mismos documentos: la copia en disco describe justo lo leído
+                self._track_document(record.name, document)
+
+            # No añadimos nodos aislados: sólo quedan los que participan en aristas
+            self._edges = {}
+            for u, v, w in _reciprocal_edges(self._records, self._records.keys()):
+                self._add_edge(u, v, w)
+            await self._publish(self._source_fingerprint())
+
+    async def apply_node_changes(self, node_names: Iterable[str]) -> None:
+        """Actualiza el grafo de forma incremental para los nodos indicados.
+
+        Recarga de BD solo esos nodos (los que ya no existen se consideran
+        borrados), retira sus aristas y vuelve a derivar las que tocan a cada
+        nodo cambiado con la misma regla de reciprocidad e igual peso que
+        `refresh_graph`. Los vecinos que queden sin aristas salen del grafo.
+        """
+        names = set(node_names)
+        if not names:
+            return
+        if self._is_follower:
+            await self._wait_for_shared(await asyncio.to_thread(self._shared.submit, sorted(names)))
+            return
+
+        async with self._write_lock:
+            fresh = {}
+            async for document in self.node_repository.stream_projection(_RECORD_FIELDS, names=names):
+                record = _node_record(document)
+                fresh[record.name] = record
+                self._track_document(record.name, document)
+
+            for name in names:
+                if name in fresh:
+                    self._records[name] = fresh[name]
+                else:
+                    self._records.pop(name, None)
+                    self._track_document(name, None)
+
+            previous_edges = {
+                (name, neighbor_name) if name < neighbor_name else (neighbor_name, name)
+                for name in names
+                for neighbor_name in self._edges.get(name, ())
+            }
+            # Quitar las aristas de los nodos cambiados en ambos sentidos
+            for name in names:
+                for neighbor_name in self._edges.pop(name, {}):
+                    neighbor_edges = self._edges.get(neighbor_name)
+                    if neighbor_edges is None:
+                        continue
+                    neighbor_edges.pop(name, None)
+                    if not neighbor_edges:
+                        del self._edges[neighbor_name]
+
+            edges = set()
+            for u, v, w in _reciprocal_edges(self._records, names):
+                self._add_edge(u, v, w)
+                edges.add((u, v))
+            # Solo importan las aristas que aparecen o desaparecen (un cambio de peso no mueve componentes)
+            removed, added = previous_edges - edges, edges - previous_edges
+            touched = names.union(*removed, *added)
+            await self._publish(
+                self._source_fingerprint(),
+                _EdgeChanges(touched=frozenset(touched), removed=frozenset(removed), added=frozenset(added)),
+            )
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+
+class PathPairDTO(BaseModel):
+    source: str
+    target: str
+
+
+class BatchShortestPathDTO(BaseModel):
+    pairs: List[PathPairDTO] = Field(
+        default_factory=list,
+        description="Explicit source/target pairs"
+    )
+    source: Optional[str] = Field(
+        default=None,
+        description="Single source node, combined with every entry of `targets`"
+    )
+    targets: List[str] = Field(
+        default_factory=list,
+        description="Target nodes for `source`"
+    )
+
+    @model_validator(mode='after')
+    def validate_request(self):
+        if self.source is None and self.targets:
+            raise ValueError("'targets' requires a 'source'")
+        if not self.pairs and not (self.source and self.targets):
+            raise ValueError("Provide 'pairs' or a 'source' with 'targets'")
+        return self
+
+    def all_pairs(self) -> List[PathPairDTO]:
+        """Pares explícitos seguidos de los formados por `source` y cada destino."""
+        pairs = list(self.pairs)
+        if self.source is not None:
+            pairs.extend(PathPairDTO(source=self.source, target=target) for target in self.targets)
+        return pairs
@@ -54,6 +54,17 @@ class NodeOutDTO(BaseModel):
     )
 
 
+class NodeSearchResultDTO(BaseModel):
+    node: NodeOutDTO
+    score: float = Field(..., description="Relevance between 0 and 1 (trigram similarity)")
+
+
+class NodeSuggestionDTO(BaseModel):
+    text: str
+    type: Literal["node", "location", "tag"]
+    count: int = Field(..., description="Number of nodes the suggestion leads to")
+
+
 class NodeStatusDTO(BaseModel):
     name: str
     status: Literal["OK", "WARNING", "ERROR"]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 class GraphNode(BaseModel):
     name: str
@@ -7,4 +7,28 @@ class GraphNode(BaseModel):
 
 class GraphPath(BaseModel):
     nodes: List[str]
-    total_weight: float
\ No newline at end of file
+    total_weight: float
+
+class NodeView(BaseModel):
+    name: str
+    url_image: Optional[str] = None
+    forward_heading: float = 0.0
+    arrow_headings: Dict[str, float] = {}  # {neighbor_name: arrow angle (radians)}
+    rotation_correction: Dict[str, int] = {}  # {arriving_from_node: degrees}
+
+class RouteHop(BaseModel):
+    name: str
+    heading: float  # yaw (radians) to face when arriving at this node
+    rotation_correction: int  # degrees for the node we arrive from
+    tiles_base_path: str
+    url_image: Optional[str] = None
+
+class GraphBridge(BaseModel):
+    nodes: Tuple[str, str]
+    separated_nodes: int  # nodes cut off (smaller side) if this edge is closed
+
+class GraphAnalytics(BaseModel):
+    version: int
+    component_sizes: List[int]  # largest first
+    bridges: List[GraphBridge]  # most disruptive first
+    articulation_points: List[str]
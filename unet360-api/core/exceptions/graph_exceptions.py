@@ -11,4 +11,12 @@ class NoPathError(GraphException):
     def __init__(self, source: str, target: str):
         self.source = source
         self.target = target
-        super().__init__(f"No path exists between '{source}' and '{target}'")
\ No newline at end of file
+        super().__init__(f"No path exists between '{source}' and '{target}'")
+
+class NoTaggedNodeError(GraphException):
+    def __init__(self, source: str, tag: str, value: str | None = None):
+        self.source = source
+        self.tag = tag
+        self.value = value
+        label = f"{tag}={value}" if value is not None else tag
+        super().__init__(f"No node tagged '{label}' is reachable from '{source}'")
\ No newline at end of file
@@ -1,3 +1,5 @@
+from typing import Dict, Iterable, Optional
+
 from fastapi import HTTPException
 from bson import ObjectId
 from beanie.odm.fields import Link
@@ -10,6 +12,7 @@ from core.dtos.node_dto import NodeOutDTO
 from core.entities.node_model import Node
 from core.entities.location_model import Location
 from core.entities.tag_model import Tag
+from core.services.catalog_cache import CatalogCache
 
 tag_repository = TagRepository()
 location_repository = LocationRepository()
@@ -32,21 +35,64 @@ async def force_to_link(obj, repository, model_class):
     raise HTTPException(status_code=404, detail=f"UNRECOGNIZABLE_OBJECT_TYPE: {obj}")
 
 
-async def transform_node_to_node_out_dto(node_db_obj: Node) -> NodeOutDTO:
-    location_name = None
-
-    if node_db_obj.location:
-        try:
-            if not hasattr(node_db_obj.location, "id"):
-                resolved_location = await location_repository.get_by_link(await force_to_link(node_db_obj.location, location_repository, Location))        
-            else:
-                resolved_location = node_db_obj.location
-        
-            if resolved_location:
-                location_name = resolved_location.name
-        except Exception as e:
-            raise HTTPException(status_code=404, detail=f"FAILED_TO_FETCH_LOCATION: {e!s}")
-    
+class LocationLoader:
+    """Resuelve nombres de Location por id en lote y los recuerda durante una petición.
+
+    Se crea uno por petición (o por operación de servicio) y se pasa a los mappers.
+    Los nombres salen del catálogo en memoria; solo los ids que no conoce se piden
+    a BD, todos en una sola consulta $in, y los repetidos no vuelven a consultarse.
+    """
+
+    def __init__(self, repository: LocationRepository = location_repository, catalog: Optional[CatalogCache] = None):
+        self.repository = repository
+        self.catalog = catalog or CatalogCache()
+        self._names: Dict[ObjectId, Optional[str]] = {}
+
+    async def load_many(self, ids: Iterable[ObjectId]) -> Dict[ObjectId, Optional[str]]:
+        ids = list(dict.fromkeys(ids))
+        missing = [location_id for location_id in ids if location_id not in self._names]
+        if missing:
+            self._names.update(await self.catalog.location_names(missing))
+            unknown = [location_id for location_id in missing if self._names[location_id] is None]
+            if unknown:
+                found = {location.id: location.name for location in await self.repository.get_by_ids(unknown)}
+                for location_id in unknown:
+                    self._names[location_id] = found.get(location_id)
+        return {location_id: self._names[location_id] for location_id in ids}
+
+
+def _location_ref(location) -> tuple[Optional[ObjectId], Optional[str]]:
+    """(id por resolver, nombre ya conocido) del campo location de un nodo."""
+    if isinstance(location, Link):
+        return location.ref.id, None
+    if isinstance(location, ObjectId):
+        return location, None
+    if isinstance(location, Location):
+        return None, location.name
+    raise HTTPException(status_code=404, detail=f"UNRECOGNIZABLE_OBJECT_TYPE: {location}")
+
+
+async def transform_node_to_node_out_dto(node_db_obj: Node, loader: Optional[LocationLoader] = None) -> NodeOutDTO:
+    return (await transform_nodes_to_node_out_dtos([node_db_obj], loader))[0]
+
+
+async def transform_nodes_to_node_out_dtos(
+    node_db_objs: list[Node], loader: Optional[LocationLoader] = None
+) -> list[NodeOutDTO]:
+    """Mapea una lista de nodos resolviendo todas sus ubicaciones con una única consulta."""
+    loader = loader or LocationLoader()
+    refs = [_location_ref(node.location) if node.location else (None, None) for node in node_db_objs]
+    try:
+        names = await loader.load_many(location_id for location_id, _ in refs if location_id is not None)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"FAILED_TO_FETCH_LOCATION: {e!s}")
+    return [
+        _node_out_dto(node, names[location_id] if location_id is not None else known_name)
+        for node, (location_id, known_name) in zip(node_db_objs, refs)
+    ]
+
+
+def _node_out_dto(node_db_obj: Node, location_name: Optional[str]) -> NodeOutDTO:
     tags_dict = {}
     if node_db_obj.tags:
         for tag_name, values in node_db_obj.tags.items():
@@ -83,7 +129,7 @@ async def update_db_obj(node_db_obj: Node, new_data: dict) -> None:
 
     if 'location' in new_data and new_data['location'] is not None:
         # new_data['location'] is expected to be a string name; resolve to link
-        loc = await location_repository.get_by_name(new_data['location'])
+        loc = await CatalogCache().get_location(new_data['location'])
         if not loc:
             raise HTTPException(status_code=404, detail="LOCATION_NOT_FOUND")
         node_db_obj.location = loc
@@ -107,7 +153,7 @@ async def update_db_obj(node_db_obj: Node, new_data: dict) -> None:
         # Validate tag names exist; values are dict[valueName -> headingFloat]
         tags_dict = {}
         for tag_name, tag_values in new_data['tags'].items():
-            tag = await tag_repository.get_by_name(tag_name)
+            tag = await CatalogCache().get_tag(tag_name)
             if not tag:
                 raise HTTPException(status_code=404, detail=f"TAG_NOT_FOUND: {tag_name}")
             tags_dict[tag_name] = tag_values
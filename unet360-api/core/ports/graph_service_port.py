@@ -1,15 +1,64 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
-from core.entities.graph_model import GraphNode, GraphPath
+from typing import Callable, Iterable, List, Dict, Mapping, Optional
+from core.entities.graph_model import GraphAnalytics, GraphNode, GraphPath, NodeView
 
 class GraphServicePort(ABC):
+    @property
+    @abstractmethod
+    def version(self) -> int:
+        pass
+
+    @abstractmethod
+    def has_node(self, node_name: str) -> bool:
+        pass
+
+    @abstractmethod
+    def are_connected(self, source: str, target: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_node_views(self, node_names: Iterable[str]) -> Dict[str, NodeView]:
+        pass
+
     @abstractmethod
     async def get_shortest_path(self, source: str, target: str) -> Optional[GraphPath]:
         pass
     
+    @abstractmethod
+    async def get_k_shortest_paths(self, source: str, target: str, k: int) -> List[GraphPath]:
+        pass
+
+    @abstractmethod
+    async def get_shortest_paths_from(self, source: str, targets: Iterable[str]) -> Dict[str, Optional[GraphPath]]:
+        pass
+
+    @abstractmethod
+    async def get_distances(self, source: str, max_weight: Optional[float] = None) -> Mapping[str, float]:
+        pass
+
+    @abstractmethod
+    async def get_nearest_tagged(self, source: str, tag: str, value: Optional[str] = None, limit: int = 1) -> List[GraphPath]:
+        pass
+
     @abstractmethod
     async def refresh_graph(self) -> None:
         pass
+
+    @abstractmethod
+    async def load_persisted_graph(self) -> bool:
+        pass
+
+    @abstractmethod
+    async def join_shared_graph(self, on_promoted: Optional[Callable[[], None]] = None) -> bool:
+        pass
+
+    @abstractmethod
+    async def leave_shared_graph(self) -> None:
+        pass
+
+    @abstractmethod
+    async def apply_node_changes(self, node_names: Iterable[str]) -> None:
+        pass
     
     @abstractmethod
     async def get_all_nodes(self) -> List[GraphNode]:
@@ -17,4 +66,12 @@ class GraphServicePort(ABC):
     
     @abstractmethod
     async def get_adjacent_nodes(self, node_name: str) -> Dict[str, float]:
+        pass
+
+    @abstractmethod
+    async def get_graph_analytics(self) -> GraphAnalytics:
+        pass
+
+    @abstractmethod
+    def get_cache_stats(self) -> Dict[str, dict]:
         pass
\ No newline at end of file
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional, Union
+
+from bson import ObjectId
+
+from adapter.database.location_repository import LocationRepository
+from adapter.database.tag_repository import TagRepository
+from core.entities.location_model import Location
+from core.entities.tag_model import Tag
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class CatalogCache:
+    """Catálogos de tags y Locations en memoria (nombre <-> id).
+
+    Son pequeños y cambian poco: se cargan enteros al arrancar y se invalidan con
+    las escrituras de TagService y LocationService. Como otros workers también
+    escriben, se recargan pasado CATALOG_CACHE_TTL_SECONDS y un nombre que no
+    aparece fuerza una recarga antes de darlo por inexistente; después se recuerda
+    como inexistente hasta la siguiente recarga o invalidación.
+    """
+    _instance: Optional["CatalogCache"] = None
+
+    def __new__(cls):
+        """Implementación del patrón para asegurar una única instancia."""
+        if cls._instance is None:
+            instance = super(CatalogCache, cls).__new__(cls)
+            instance.tag_repository = TagRepository()
+            instance.location_repository = LocationRepository()
+            instance.ttl_seconds = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "60"))
+            instance._tags_by_name = {}
+            instance._locations_by_name = {}
+            instance._location_names_by_id = {}
+            instance._loaded_at = None
+            # Cada invalidación incrementa la generación; una carga iniciada antes no se da por vigente
+            instance._generation = 0
+            instance._load_lock = asyncio.Lock()
+            # Cargas terminadas: quien esperaba el lock sabe si otro ya recargó por él
+            instance._loads = 0
+            # {(tipo, nombre)} que no estaban en la última carga
+            instance._missing = set()
+            cls._instance = instance
+        return cls._instance
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._loaded_at = None
+        self._missing = set()
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and (
+            self.ttl_seconds <= 0 or time.monotonic() - self._loaded_at <= self.ttl_seconds
+        )
+
+    async def load(self) -> None:
+        """Lee ambos catálogos y los publica con un cambio de referencia."""
+        async with self._load_lock:
+            await self._read()
+
+    async def _read(self) -> None:
+        # Con `_load_lock` tomado
+        generation = self._generation
+        tags = await self.tag_repository.get_all()
+        locations = await self.location_repository.get_all()
+        self._tags_by_name = {tag.name: tag for tag in tags}
+        self._locations_by_name = {location.name: location for location in locations}
+        self._location_names_by_id = {location.id: location.name for location in locations}
+        self._missing = set()
+        self._loads += 1
+        if generation == self._generation:
+            self._loaded_at = time.monotonic()
+        logger.info("Catalog cache loaded (%s tags, %s locations)", len(tags), len(locations))
+
+    async def _ensure_fresh(self) -> None:
+        if self._fresh():
+            return
+        async with self._load_lock:
+            # Quien tenía el lock puede haberlo recargado ya
+            if not self._fresh():
+                await self._read()
+
+    async def _lookup(self, kind: str, name: str) -> Optional[Union[Tag, Location]]:
+        loads = self._loads
+        await self._ensure_fresh()
+        catalog = self._tags_by_name if kind == "tag" else self._locations_by_name
+        found = catalog.get(name)
+        if found is not None or (kind, name) in self._missing:
+            return found
+        # Puede haberse creado en otro worker: se recarga salvo que ya haya terminado una carga en esta llamada
+        async with self._load_lock:
+            if self._loads == loads:
+                await self._read()
+        catalog = self._tags_by_name if kind == "tag" else self._locations_by_name
+        found = catalog.get(name)
+        if found is None:
+            self._missing.add((kind, name))
+        return found
+
+    async def get_tag(self, name: str) -> Optional[Tag]:
+        return await self._lookup("tag", name)
+
+    async def get_location(self, name: str) -> Optional[Location]:
+        return await self._lookup("location", name)
+
+    async def location_names(self, ids: Iterable[ObjectId]) -> Dict[ObjectId, Optional[str]]:
+        """{id: nombre} de las Locations del catálogo; None para los ids que no conoce."""
+        await self._ensure_fresh()
+        return {location_id: self._location_names_by_id.get(location_id) for location_id in ids}
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from core.ports.graph_service_port import GraphServicePort
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class GraphRefreshScheduler:
+    """Agrupa las solicitudes de refresco del grafo y las ejecuta con un único worker.
+
+    Las solicitudes que llegan dentro de la ventana de agrupación se fusionan en
+    una sola actualización (incremental por nombres de nodo, o completa si alguna
+    lo pidió). Como mucho hay una reconstrucción en curso y un lote pendiente.
+    Cada solicitud devuelve un ticket que puede esperarse con `wait_for` para
+    saber cuándo el grafo refleja la escritura.
+    """
+    _instance: Optional["GraphRefreshScheduler"] = None
+
+    def __new__(cls, graph_adapter: GraphServicePort):
+        """Implementación del patrón para asegurar una única instancia."""
+        if cls._instance is None:
+            instance = super(GraphRefreshScheduler, cls).__new__(cls)
+            instance.graph_adapter = graph_adapter
+            instance.debounce_seconds = float(os.getenv("GRAPH_REFRESH_DEBOUNCE_SECONDS", "0.5"))
+            instance.reconcile_interval_seconds = float(os.getenv("GRAPH_RECONCILE_INTERVAL_SECONDS", "600"))
+
+            instance._pending_names = set()
+            instance._pending_full = False
+            instance._requested_ticket = 0
+            instance._completed_ticket = 0
+            instance._waiters = []
+            instance._wakeup = asyncio.Event()
+            instance._in_flight = False
+            instance._worker_task = None
+            instance._reconcile_task = None
+
+            instance.last_version = None
+            instance.last_duration_seconds = None
+            instance.last_refreshed_at = None
+            instance.last_error = None
+            cls._instance = instance
+        return cls._instance
+
+    async def start(self) -> None:
+        """Publica el grafo inicial (copia en disco vigente o reconstrucción completa) y
+        arranca el worker y la reconciliación periódica."""
+        started = time.perf_counter()
+        if await self.graph_adapter.join_shared_graph(on_promoted=self._start_reconcile):
+            # Otro worker construye el grafo y reconcilia: este solo lo sigue y le reenvía sus escrituras
+            # (si llega a ser líder, arranca entonces la reconciliación)
+            self.last_version = self.graph_adapter.version
+            self._ensure_worker()
+            return
+        if await self.graph_adapter.load_persisted_graph():
+            self.last_duration_seconds = time.perf_counter() - started
+            self.last_refreshed_at = datetime.now(timezone.utc)
+            self.last_version = self.graph_adapter.version
+        else:
+            await self._run_refresh(set(), full=True, ticket=self._requested_ticket)
+        self._ensure_worker()
+        self._start_reconcile()
+
+    async def stop(self) -> None:
+        """Detiene el worker y la reconciliación (y sale del grafo compartido); los que esperaban reciben cancelación."""
+        for attr in ("_worker_task", "_reconcile_task"):
+            task = getattr(self, attr)
+            setattr(self, attr, None)
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        for _, future in self._waiters:
+            if not future.done():
+                future.cancel()
+        self._waiters = []
+        await self.graph_adapter.leave_shared_graph()
+
+    def request_refresh(self, node_names: Optional[Iterable[str]] = None) -> int:
+        """Encola un refresco (incremental para `node_names`, completo si es None) y devuelve su ticket."""
+        if node_names is None:
+            self._pending_full = True
+        else:
+            self._pending_names.update(node_names)
+        self._requested_ticket += 1
+        self._wakeup.set()
+        self._ensure_worker()
+        return self._requested_ticket
+
+    async def wait_for(self, ticket: int) -> None:
+        """Espera a que el grafo publicado refleje la solicitud del ticket indicado."""
+        if ticket <= self._completed_ticket:
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((ticket, future))
+        await future
+
+    async def refresh(self, node_names: Optional[Iterable[str]] = None, wait: bool = False) -> int:
+        """Atajo para encolar un refresco y, opcionalmente, esperar a que se aplique."""
+        ticket = self.request_refresh(node_names)
+        if wait:
+            await self.wait_for(ticket)
+        return ticket
+
+    def status(self) -> dict:
+        """Estado del último refresco para monitorización."""
+        return {
+            "version": self.last_version,
+            "last_duration_seconds": self.last_duration_seconds,
+            "last_refreshed_at": self.last_refreshed_at.isoformat() if self.last_refreshed_at else None,
+            "last_error": self.last_error,
+            "in_flight": self._in_flight,
+            "pending": self._pending_full or bool(self._pending_names),
+        }
+
+    def _start_reconcile(self) -> None:
+        if self.reconcile_interval_seconds > 0 and (self._reconcile_task is None or self._reconcile_task.done()):
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+
+    def _ensure_worker(self) -> None:
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker_loop())
+
+    async def _worker_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # Ventana de agrupación: las escrituras en ráfaga se fusionan en un solo lote
+            await asyncio.sleep(self.debounce_seconds)
+            self._wakeup.clear()
+
+            names, full, ticket = self._pending_names, self._pending_full, self._requested_ticket
+            self._pending_names, self._pending_full = set(), False
+            await self._run_refresh(names, full=full, ticket=ticket)
+
+    async def _run_refresh(self, names: set[str], full: bool, ticket: int) -> None:
+        self._in_flight = True
+        started = time.perf_counter()
+        error: Optional[Exception] = None
+        try:
+            if full:
+                await self.graph_adapter.refresh_graph()
+            else:
+                await self.graph_adapter.apply_node_changes(names)
+        except Exception as e:
+            logger.exception("Graph refresh failed")
+            error = e
+        finally:
+            self._in_flight = False
+
+        self.last_duration_seconds = time.perf_counter() - started
+        self.last_refreshed_at = datetime.now(timezone.utc)
+        self.last_version = self.graph_adapter.version
+        self.last_error = str(error) if error else None
+        self._completed_ticket = max(self._completed_ticket, ticket)
+        self._release_waiters(ticket, error)
+
+    def _release_waiters(self, ticket: int, error: Optional[Exception]) -> None:
+        remaining = []
+        for waiter_ticket, future in self._waiters:
+            if waiter_ticket > ticket:
+                remaining.append((waiter_ticket, future))
+            elif not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(None)
+        self._waiters = remaining
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval_seconds)
+            self.request_refresh()
@@ -1,23 +1,116 @@
-from typing import Optional, List, Dict
+import math
+from typing import AsyncIterator, Iterable, Mapping, Optional, List, Dict, Tuple, Union
 from core.ports.graph_service_port import GraphServicePort
-from core.entities.graph_model import GraphPath, GraphNode
-from core.exceptions.graph_exceptions import NodeNotFoundError, NoPathError
+from core.entities.graph_model import GraphAnalytics, GraphPath, GraphNode, RouteHop
+from core.exceptions.graph_exceptions import GraphException, NodeNotFoundError, NoPathError, NoTaggedNodeError
+
+# Ruta donde la API sirve los tiles de cada panorama (ver el montaje en main.py)
+TILES_BASE_PATH = "/tiles"
 
 class GraphService:
     def __init__(self, graph_adapter: GraphServicePort):
         self.graph_adapter = graph_adapter
     
     async def calculate_shortest_path(self, source: str, target: str) -> GraphPath:
-        """Calcula el camino más corto entre dos nodos."""
+        """Calcula el camino más corto entre dos nodos.
+
+        Los nodos desconocidos y los pares de componentes distintas se rechazan en O(1)
+        con el índice de componentes, sin lanzar ninguna búsqueda.
+        """
+        if not self.graph_adapter.has_node(source):
+            raise NodeNotFoundError(source)
+        if not self.graph_adapter.has_node(target):
+            raise NodeNotFoundError(target)
+        if not self.graph_adapter.are_connected(source, target):
+            raise NoPathError(source, target)
         path = await self.graph_adapter.get_shortest_path(source, target)
         if not path:
-            if source not in [node.name for node in await self.graph_adapter.get_all_nodes()]:
-                raise NodeNotFoundError(source)
-            if target not in [node.name for node in await self.graph_adapter.get_all_nodes()]:
-                raise NodeNotFoundError(target)
             raise NoPathError(source, target)
         return path
     
+    async def calculate_k_shortest_paths(self, source: str, target: str, k: int) -> List[GraphPath]:
+        """Calcula hasta `k` rutas alternativas sin ciclos, de la más corta a la más larga."""
+        if not self.graph_adapter.has_node(source):
+            raise NodeNotFoundError(source)
+        if not self.graph_adapter.has_node(target):
+            raise NodeNotFoundError(target)
+        paths = await self.graph_adapter.get_k_shortest_paths(source, target, k)
+        if not paths:
+            raise NoPathError(source, target)
+        return paths
+    
+    def describe_route(self, path: GraphPath) -> List[RouteHop]:
+        """Datos del visor para cada salto de la ruta, sin pedir cada nodo por separado.
+
+        La orientación de cada salto es la flecha hacia el siguiente nodo; en el último
+        (o si falta la flecha) es la orientación frontal ajustada con la corrección de
+        rotación del nodo del que se llega, como hace el visor.
+        """
+        views = self.graph_adapter.get_node_views(path.nodes)
+        hops = []
+        for i, name in enumerate(path.nodes):
+            view = views.get(name)
+            previous = path.nodes[i - 1] if i > 0 else None
+            following = path.nodes[i + 1] if i + 1 < len(path.nodes) else None
+            rotation = view.rotation_correction.get(previous, 0) if view and previous else 0
+            heading = view.arrow_headings.get(following) if view and following else None
+            if heading is None:
+                heading = (view.forward_heading if view else 0.0) - math.radians(rotation)
+            hops.append(RouteHop(
+                name=name,
+                heading=heading,
+                rotation_correction=rotation,
+                tiles_base_path=f"{TILES_BASE_PATH}/{name}",
+                url_image=view.url_image if view else None,
+            ))
+        return hops
+    
+    async def calculate_shortest_paths(
+        self, pairs: Iterable[Tuple[str, str]]
+    ) -> AsyncIterator[Tuple[str, str, Union[GraphPath, GraphException]]]:
+        """Calcula los caminos de varios pares agrupándolos por origen (una búsqueda por origen).
+
+        Produce (origen, destino, camino) en cuanto se resuelve cada grupo; los pares
+        sin solución producen la excepción correspondiente en lugar del camino.
+        """
+        groups: Dict[str, List[str]] = {}
+        for source, target in pairs:
+            groups.setdefault(source, []).append(target)
+
+        for source, targets in groups.items():
+            if not self.graph_adapter.has_node(source):
+                for target in targets:
+                    yield source, target, NodeNotFoundError(source)
+                continue
+            paths = await self.graph_adapter.get_shortest_paths_from(source, targets)
+            for target in targets:
+                path = paths.get(target)
+                if path:
+                    yield source, target, path
+                elif not self.graph_adapter.has_node(target):
+                    yield source, target, NodeNotFoundError(target)
+                else:
+                    yield source, target, NoPathError(source, target)
+    
+    async def calculate_distances(self, source: str, max_weight: Optional[float] = None) -> Mapping[str, float]:
+        """Distancia desde un nodo a todos los alcanzables, opcionalmente hasta un peso máximo."""
+        if not self.graph_adapter.has_node(source):
+            raise NodeNotFoundError(source)
+        return await self.graph_adapter.get_distances(source, max_weight)
+    
+    async def find_nearest_tagged(self, source: str, tag: str, value: Optional[str] = None, limit: int = 1) -> List[GraphPath]:
+        """Caminos a los nodos más cercanos con el tag (y valor) indicado."""
+        paths = await self.graph_adapter.get_nearest_tagged(source, tag, value, limit)
+        if not paths:
+            if not self.graph_adapter.has_node(source):
+                raise NodeNotFoundError(source)
+            raise NoTaggedNodeError(source, tag, value)
+        return paths
+    
+    async def get_graph_analytics(self) -> GraphAnalytics:
+        """Puentes (pasillos cuyo cierre aísla parte del campus), puntos de articulación y tamaños de componente."""
+        return await self.graph_adapter.get_graph_analytics()
+    
     async def refresh_graph(self) -> None:
         """Refresca el grafo cargando los nodos y aristas desde la base de datos."""
         await self.graph_adapter.refresh_graph()
@@ -29,6 +122,6 @@ class GraphService:
     async def get_adjacent_nodes(self, node_name: str) -> Dict[str, float]:
         """Obtiene los nodos adyacentes a un nodo específico."""
         adjacent = await self.graph_adapter.get_adjacent_nodes(node_name)
-        if not adjacent and node_name not in [node.name for node in await self.graph_adapter.get_all_nodes()]:
+        if not adjacent and not self.graph_adapter.has_node(node_name):
             raise NodeNotFoundError(node_name)
         return adjacent
\ No newline at end of file
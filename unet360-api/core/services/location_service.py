@@ -4,6 +4,8 @@ from fastapi import HTTPException
 from adapter.database.location_repository import LocationRepository
 from core.dtos.location_dto import LocationCreateDTO, LocationUpdateDTO, LocationOutDTO
 from core.entities.location_model import Location
+from core.services.node_search_index import NodeSearchIndex
+from core.services.catalog_cache import CatalogCache
 from core.messages.error_messages import CREATE_ERROR_MESSAGE, OBJECT_NOT_FOUND_ERROR_MESSAGE
 
 
@@ -13,6 +15,8 @@ class LocationService:
 
     def __init__(self, repository: LocationRepository):
         self.repository = repository
+        self.search_index = NodeSearchIndex()
+        self.catalog = CatalogCache()
 
     async def create_location(
         self, new_location: LocationCreateDTO
@@ -23,6 +27,8 @@ class LocationService:
         if not new_location_db_obj.id:
             raise HTTPException(status_code=500, detail=CREATE_ERROR_MESSAGE)
 
+        self.catalog.invalidate()
+        self.search_index.set_location(new_location_db_obj.id, new_location_db_obj.name)
         return LocationOutDTO(**new_location_db_obj.model_dump())
 
     async def get_location_by_name(self, name: str) -> LocationOutDTO | None:
@@ -47,6 +53,9 @@ class LocationService:
             setattr(location, key, value)
 
         updated = await self.repository.update(location)
+        # Los nodos enlazan la Location por id: solo cambia el nombre por el que se les encuentra
+        self.catalog.invalidate()
+        self.search_index.set_location(updated.id, updated.name)
         return LocationOutDTO(**updated.model_dump())
 
     async def delete_location(self, name: str):
@@ -54,4 +63,6 @@ class LocationService:
         if not location:
             raise HTTPException(status_code=404, detail=OBJECT_NOT_FOUND_ERROR_MESSAGE)
         await self.repository.delete(location)
+        self.catalog.invalidate()
+        self.search_index.set_location(location.id, None)
         return {"message": "Location deleted"}
\ No newline at end of file
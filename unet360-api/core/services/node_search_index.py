@@ -0,0 +1,526 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from adapter.database.location_repository import LocationRepository
+from adapter.database.node_repository import NodeRepository
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Longitud máxima de los n-gramas indexados por término
+_GRAM_SIZE = 3
+
+# Los prefijos de hasta esta longitud abarcan casi todo el array de autocompletado
+# (todos los nombres de nodo empiezan por dígito): sus mejores sugerencias se guardan ordenadas
+_SHORT_PREFIX = 2
+# Sugerencias guardadas por prefijo corto (el `limit` máximo que admite la API)
+_TOP_SUGGESTIONS = 50
+
+
+def _grams(term: str) -> Set[str]:
+    """Todas las subcadenas de 1 a `_GRAM_SIZE` caracteres del término."""
+    return {
+        term[i:i + size]
+        for size in range(1, _GRAM_SIZE + 1)
+        for i in range(len(term) - size + 1)
+    }
+
+
+def _fold(text: str) -> str:
+    """Minúsculas y sin tildes, para que "cafetin" y "Cafetín" se comparen igual."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _words(text: str) -> Set[str]:
+    return set(re.findall(r"\w+", _fold(text)))
+
+
+def _trigrams(word: str) -> Set[str]:
+    """Trigramas de la palabra con relleno al estilo pg_trgm (dos espacios delante, uno detrás)."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _location_id(location: Any) -> Optional[str]:
+    """Id de la Location: Link sin resolver, documento ya cargado o DBRef crudo."""
+    if location is None:
+        return None
+    ref = getattr(location, 'ref', None)
+    location_id = ref.id if ref is not None else getattr(location, 'id', None)
+    return str(location_id) if location_id is not None else None
+
+
+def _tag_entries(tags: Optional[Mapping[str, Any]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """((clave, (valores...)), ...) a partir de Node.tags (lista de valores o dict {valor: heading})."""
+    entries = []
+    for tag_key, tag_value in (tags or {}).items():
+        if isinstance(tag_value, list):
+            values = tuple(str(v) for v in tag_value)
+        elif isinstance(tag_value, dict):
+            values = tuple(str(k) for k in tag_value.keys())
+        else:
+            values = ()
+        entries.append((tag_key, values))
+    return tuple(entries)
+
+
+def _node_fields(node: Any) -> Tuple[str, Optional[str], Tuple[Tuple[str, Tuple[str, ...]], ...]]:
+    """(nombre, id de Location, tags) de un Node o de su proyección cruda."""
+    if isinstance(node, Mapping):
+        return node["name"], _location_id(node.get("location")), _tag_entries(node.get("tags"))
+    return node.name, _location_id(node.location), _tag_entries(node.tags)
+
+
+def _suggestion_keys(label: str) -> Set[Tuple[str, int]]:
+    """Claves de autocompletado (clave, posición): el texto entero (posición 0) y desde el
+    inicio de cada palabra, normalizados."""
+    folded = _fold(label)
+    return {(folded, 0), *((folded[match.start():], match.start()) for match in re.finditer(r"\w+", folded))}
+
+
+def _short_prefixes(keys: Iterable[Tuple[str, int]]) -> Dict[str, bool]:
+    """{prefijo corto: si es prefijo del texto entero} para las claves de una sugerencia."""
+    prefixes: Dict[str, bool] = {}
+    for key, offset in keys:
+        for size in range(1, min(_SHORT_PREFIX, len(key)) + 1):
+            prefix = key[:size]
+            prefixes[prefix] = prefixes.get(prefix, False) or offset == 0
+    return prefixes
+
+
+class _SearchState:
+    """Listas de apariciones: término -> nodos y n-grama -> términos.
+
+    Un término es cada texto buscable de un nodo (nombre, nombre de su Location,
+    clave o valor de tag) en minúsculas. Además guarda las sugerencias de
+    autocompletado (nombres de nodo, de Location y valores de tag) en un array
+    ordenado por clave normalizada para buscarlas por prefijo con bisect, y para
+    los prefijos cortos el ranking ya resuelto, que se mantiene con cada cambio.
+    """
+
+    def __init__(self):
+        # {nodo: (id de Location, ((clave de tag, (valores...)), ...))}
+        self.nodes: Dict[str, Tuple[Optional[str], Tuple[Tuple[str, Tuple[str, ...]], ...]]] = {}
+        self.location_names: Dict[str, str] = {}
+        self.by_location: Dict[str, Set[str]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.grams: Dict[str, Set[str]] = {}
+        # Búsqueda aproximada: palabra -> términos que la contienen, trigrama -> palabras y nº de trigramas por palabra
+        self.words: Dict[str, Set[str]] = {}
+        self.word_grams: Dict[str, Set[str]] = {}
+        self.word_sizes: Dict[str, int] = {}
+        # Autocompletado: {(tipo, texto): nº de nodos} y [(clave, posición, tipo, texto)] ordenado
+        self.suggestion_counts: Dict[Tuple[str, str], int] = {}
+        self.prefixes: List[Tuple[str, int, str, str]] = []
+        # {prefijo corto: [(no es texto entero, -nº de nodos, longitud, (tipo, texto))] ordenado};
+        # un prefijo sin entrada se calcula en la siguiente consulta
+        self.top: Dict[str, List[Tuple[bool, int, int, Tuple[str, str]]]] = {}
+        # Durante la carga inicial las claves se acumulan sin ordenar (ver `sort_prefixes`)
+        self._prefixes_sorted = True
+
+    def _location_name(self, name: str) -> Optional[str]:
+        location_id = self.nodes[name][0]
+        return self.location_names.get(location_id) if location_id is not None else None
+
+    def terms_of(self, name: str) -> List[str]:
+        """Términos del nodo en el mismo orden en que se concatenaba el texto buscable."""
+        terms = [name.lower()]
+        location_name = self._location_name(name)
+        if location_name is not None:
+            terms.append(location_name.lower())
+        for tag_key, values in self.nodes[name][1]:
+            terms.append(tag_key.lower())
+            terms.extend(value.lower() for value in values)
+        return terms
+
+    def suggestions_of(self, name: str) -> Set[Tuple[str, str]]:
+        suggestions = {("node", name)}
+        location_name = self._location_name(name)
+        if location_name is not None:
+            suggestions.add(("location", location_name))
+        for _, values in self.nodes[name][1]:
+            suggestions.update(("tag", value) for value in values if value)
+        return suggestions
+
+    def defer_sorting(self) -> None:
+        """Carga masiva: las claves nuevas se añaden al final y se ordenan una vez en `sort_prefixes`."""
+        self._prefixes_sorted = False
+
+    def sort_prefixes(self) -> None:
+        self.prefixes.sort()
+        self._prefixes_sorted = True
+        self.top.clear()
+
+    def _count_suggestions(self, name: str, delta: int) -> None:
+        """Suma `delta` a las sugerencias del nodo; las que aparecen o desaparecen se insertan
+        o quitan del array ordenado con bisect."""
+        for suggestion in self.suggestions_of(name):
+            previous = self.suggestion_counts.get(suggestion, 0)
+            count = max(previous + delta, 0)
+            keys = _suggestion_keys(suggestion[1])
+            if count > 0:
+                self.suggestion_counts[suggestion] = count
+            else:
+                self.suggestion_counts.pop(suggestion, None)
+            if previous == 0 and count > 0:
+                for key, offset in keys:
+                    self._add_prefix((key, offset, *suggestion))
+            elif previous > 0 and count == 0:
+                for key, offset in keys:
+                    self._remove_prefix((key, offset, *suggestion))
+            if self.top:
+                self._update_top(suggestion, keys, previous, count)
+
+    def _add_prefix(self, entry: Tuple[str, int, str, str]) -> None:
+        if self._prefixes_sorted:
+            bisect.insort(self.prefixes, entry)
+        else:
+            self.prefixes.append(entry)
+
+    def _remove_prefix(self, entry: Tuple[str, int, str, str]) -> None:
+        if not self._prefixes_sorted:
+            self.prefixes.remove(entry)
+            return
+        position = bisect.bisect_left(self.prefixes, entry)
+        if position < len(self.prefixes) and self.prefixes[position] == entry:
+            del self.prefixes[position]
+
+    def _update_top(
+        self, suggestion: Tuple[str, str], keys: Set[Tuple[str, int]], previous: int, count: int
+    ) -> None:
+        """Recoloca la sugerencia en el ranking guardado de sus prefijos cortos. Si baja o
+        desaparece de un ranking lleno, otra que no estaba podría entrar: ese prefijo se descarta
+        y se recalcula en la siguiente consulta."""
+        for prefix, whole in _short_prefixes(keys).items():
+            ranked = self.top.get(prefix)
+            if ranked is None:
+                continue
+            if previous > 0:
+                entry = (not whole, -previous, len(suggestion[1]), suggestion)
+                position = bisect.bisect_left(ranked, entry)
+                if position < len(ranked) and ranked[position] == entry:
+                    full = len(ranked) == _TOP_SUGGESTIONS
+                    del ranked[position]
+                    if count < previous and full:
+                        del self.top[prefix]
+                        continue
+            if count > 0:
+                entry = (not whole, -count, len(suggestion[1]), suggestion)
+                if len(ranked) < _TOP_SUGGESTIONS or entry < ranked[-1]:
+                    bisect.insort(ranked, entry)
+                    del ranked[_TOP_SUGGESTIONS:]
+
+    def _index(self, name: str) -> None:
+        self._count_suggestions(name, 1)
+        for term in self.terms_of(name):
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = set()
+                for gram in _grams(term):
+                    self.grams.setdefault(gram, set()).add(term)
+                self._index_words(term)
+            posting.add(name)
+
+    def _index_words(self, term: str) -> None:
+        for word in _words(term):
+            terms = self.words.get(word)
+            if terms is None:
+                terms = self.words[word] = set()
+                trigrams = _trigrams(word)
+                self.word_sizes[word] = len(trigrams)
+                for trigram in trigrams:
+                    self.word_grams.setdefault(trigram, set()).add(word)
+            terms.add(term)
+
+    def _unindex_words(self, term: str) -> None:
+        for word in _words(term):
+            terms = self.words.get(word)
+            if terms is None:
+                continue
+            terms.discard(term)
+            if terms:
+                continue
+            del self.words[word], self.word_sizes[word]
+            for trigram in _trigrams(word):
+                words = self.word_grams.get(trigram)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self.word_grams[trigram]
+
+    def _unindex(self, name: str) -> None:
+        self._count_suggestions(name, -1)
+        for term in set(self.terms_of(name)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.discard(name)
+            if posting:
+                continue
+            del self.postings[term]
+            for gram in _grams(term):
+                terms = self.grams.get(gram)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.grams[gram]
+            self._unindex_words(term)
+
+    def upsert_node(
+        self, name: str, location_id: Optional[str], tags: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    ) -> None:
+        self.remove_node(name)
+        self.nodes[name] = (location_id, tags)
+        if location_id is not None:
+            self.by_location.setdefault(location_id, set()).add(name)
+        self._index(name)
+
+    def remove_node(self, name: str) -> None:
+        if name not in self.nodes:
+            return
+        self._unindex(name)
+        location_id, _ = self.nodes.pop(name)
+        members = self.by_location.get(location_id)
+        if members is not None:
+            members.discard(name)
+            if not members:
+                del self.by_location[location_id]
+
+    def set_location(self, location_id: str, location_name: Optional[str]) -> None:
+        """Renombra (o borra, con None) una Location y reindexa solo sus nodos."""
+        members = self.by_location.get(location_id, ())
+        for name in members:
+            self._unindex(name)
+        if location_name is None:
+            self.location_names.pop(location_id, None)
+        else:
+            self.location_names[location_id] = location_name
+        for name in members:
+            self._index(name)
+
+    def matching_terms(self, keyword: str) -> Set[str]:
+        """Términos que contienen `keyword`: lectura directa del n-grama si es corta, y si no
+        intersección de sus trigramas y comprobación final de la subcadena."""
+        if len(keyword) <= _GRAM_SIZE:
+            return self.grams.get(keyword, set())
+        candidates = None
+        for gram in sorted(
+            {keyword[i:i + _GRAM_SIZE] for i in range(len(keyword) - _GRAM_SIZE + 1)},
+            key=lambda g: len(self.grams.get(g, ())),
+        ):
+            terms = self.grams.get(gram)
+            if not terms:
+                return set()
+            candidates = set(terms) if candidates is None else candidates & terms
+            if not candidates:
+                return set()
+        return {term for term in candidates if keyword in term}
+
+    def matching_nodes(self, keyword: str) -> Set[str]:
+        if any(c.isspace() for c in keyword):
+            # Una palabra con espacios puede abarcar varios términos: se filtra por sus partes
+            # y se comprueba contra el texto concatenado como antes
+            candidates = self.search(keyword.split())
+            return {name for name in candidates if keyword in " ".join(self.terms_of(name))}
+        nodes: Set[str] = set()
+        for term in self.matching_terms(keyword):
+            nodes |= self.postings[term]
+        return nodes
+
+    def search(self, keywords: Iterable[str]) -> Set[str]:
+        """Nodos cuyo texto buscable contiene todas las palabras (AND de listas de apariciones)."""
+        result: Optional[Set[str]] = None
+        # Las palabras largas son más selectivas: se intersecan primero
+        for keyword in sorted({k for k in keywords if k}, key=len, reverse=True):
+            nodes = self.matching_nodes(keyword)
+            result = nodes if result is None else result & nodes
+            if not result:
+                return set()
+        return set(self.nodes) if result is None else result
+
+    def similar_words(self, word: str, threshold: float) -> Iterator[Tuple[str, float]]:
+        """Palabras indexadas con similitud de trigramas (Jaccard) con `word` de al menos `threshold`.
+
+        Solo se recorren las palabras que comparten algún trigrama, contando las coincidencias
+        en las listas de apariciones en lugar de calcular distancias de edición.
+        """
+        trigrams = _trigrams(word)
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self.word_grams.get(trigram, ()))
+        for candidate, common in shared.items():
+            similarity = common / (len(trigrams) + self.word_sizes[candidate] - common)
+            if similarity >= threshold:
+                yield candidate, similarity
+
+    def fuzzy_search(self, query: str, limit: int, threshold: float) -> List[Tuple[str, float]]:
+        """Nodos ordenados por relevancia: media, sobre las palabras de la consulta, de la mejor
+        similitud de cada una con alguna palabra del nodo; se descartan los de media bajo `threshold`."""
+        query_words = _words(query)
+        if not query_words or limit <= 0:
+            return []
+        totals: Dict[str, float] = {}
+        for query_word in query_words:
+            best: Dict[str, float] = {}
+            for word, similarity in self.similar_words(query_word, threshold):
+                for term in self.words[word]:
+                    for name in self.postings[term]:
+                        if similarity > best.get(name, 0.0):
+                            best[name] = similarity
+            for name, similarity in best.items():
+                totals[name] = totals.get(name, 0.0) + similarity
+        ranked = (
+            (name, total / len(query_words))
+            for name, total in totals.items()
+            if total / len(query_words) >= threshold
+        )
+        return heapq.nsmallest(limit, ranked, key=lambda item: (-item[1], item[0]))
+
+    def autocomplete(self, prefix: str, limit: int) -> List[Tuple[str, str, int]]:
+        """[(tipo, texto, nº de nodos)] que empiezan por `prefix` (el texto o una de sus palabras).
+
+        Primero los que empiezan por el prefijo desde el principio, luego los de más nodos
+        y los más cortos.
+        """
+        prefix = _fold(prefix).strip()
+        if not prefix or limit <= 0:
+            return []
+        if len(prefix) <= _SHORT_PREFIX and limit <= _TOP_SUGGESTIONS:
+            ranked = self.top.get(prefix)
+            if ranked is None:
+                ranked = self.top[prefix] = self._rank(prefix, _TOP_SUGGESTIONS)
+            ranked = ranked[:limit]
+        else:
+            ranked = self._rank(prefix, limit)
+        return [(kind, text, -count) for _, count, _, (kind, text) in ranked]
+
+    def _rank(self, prefix: str, limit: int) -> List[Tuple[bool, int, int, Tuple[str, str]]]:
+        """Recorre el rango del prefijo en el array ordenado; la posición guardada con cada
+        clave dice si el prefijo lo es del texto entero."""
+        matches: Dict[Tuple[str, str], bool] = {}
+        position = bisect.bisect_left(self.prefixes, (prefix,))
+        while position < len(self.prefixes) and self.prefixes[position][0].startswith(prefix):
+            _, offset, kind, text = self.prefixes[position]
+            matches[(kind, text)] = matches.get((kind, text), False) or offset == 0
+            position += 1
+        return heapq.nsmallest(
+            limit,
+            (
+                (not whole, -self.suggestion_counts[suggestion], len(suggestion[1]), suggestion)
+                for suggestion, whole in matches.items()
+            ),
+        )
+
+
+class NodeSearchIndex:
+    """Índice invertido en memoria de nodos por nombre, Location y tags.
+
+    Se carga una vez (proyección de nodos y catálogo de Locations) y se mantiene
+    con las escrituras de NodeService y LocationService. Como cada worker tiene
+    su propia copia, se recarga en segundo plano pasado SEARCH_INDEX_RELOAD_SECONDS
+    para recoger las escrituras hechas en otros procesos.
+    """
+    _instance: Optional["NodeSearchIndex"] = None
+
+    def __new__(cls):
+        """Implementación del patrón para asegurar una única instancia."""
+        if cls._instance is None:
+            instance = super(NodeSearchIndex, cls).__new__(cls)
+            instance.node_repository = NodeRepository()
+            instance.location_repository = LocationRepository()
+            instance.reload_seconds = float(os.getenv("SEARCH_INDEX_RELOAD_SECONDS", "600"))
+            instance.fuzzy_threshold = float(os.getenv("SEARCH_FUZZY_THRESHOLD", "0.3"))
+            instance._state = None
+            instance._loaded_at = None
+            instance._load_lock = asyncio.Lock()
+            instance._reload_task = None
+            # Escrituras recibidas durante una carga, para aplicarlas también al estado nuevo
+            instance._pending = None
+            cls._instance = instance
+        return cls._instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._state is not None
+
+    async def load(self) -> None:
+        """Construye el índice aparte y lo publica con un cambio de referencia."""
+        async with self._load_lock:
+            started = time.perf_counter()
+            self._pending = []
+            try:
+                state = _SearchState()
+                for location in await self.location_repository.get_all():
+                    state.location_names[str(location.id)] = location.name
+                state.defer_sorting()
+                async for document in self.node_repository.stream_projection(("name", "location", "tags")):
+                    state.upsert_node(*_node_fields(document))
+                state.sort_prefixes()
+                for operation, args in self._pending:
+                    getattr(state, operation)(*args)
+                self._state = state
+                self._loaded_at = time.monotonic()
+            finally:
+                self._pending = None
+            logger.info(
+                "Node search index loaded (%s nodes, %s terms) in %.3fs",
+                len(state.nodes), len(state.postings), time.perf_counter() - started,
+            )
+
+    async def _ensure_loaded(self) -> _SearchState:
+        if self._state is None:
+            await self.load()
+        elif (
+            self.reload_seconds > 0
+            and time.monotonic() - self._loaded_at > self.reload_seconds
+            and (self._reload_task is None or self._reload_task.done())
+        ):
+            self._reload_task = asyncio.create_task(self._reload())
+        return self._state
+
+    async def _reload(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Failed to reload the node search index")
+
+    async def search(self, keywords: Iterable[str]) -> Set[str]:
+        """Nombres de los nodos cuyo texto buscable contiene todas las palabras (sin distinguir mayúsculas)."""
+        state = await self._ensure_loaded()
+        return state.search(k.lower() for k in keywords)
+
+    async def fuzzy_search(self, query: str, limit: int) -> List[Tuple[str, float]]:
+        """[(nombre, puntuación 0..1)] de los `limit` nodos más parecidos a la consulta, tolerando
+        erratas y tildes, del más relevante al menos."""
+        state = await self._ensure_loaded()
+        return state.fuzzy_search(query, limit, self.fuzzy_threshold)
+
+    async def autocomplete(self, prefix: str, limit: int) -> List[Tuple[str, str, int]]:
+        """[(tipo, texto, nº de nodos)] con los `limit` mejores nombres de nodo, Locations y valores de tag para el prefijo."""
+        state = await self._ensure_loaded()
+        return state.autocomplete(prefix, limit)
+
+    def _apply(self, operation: str, *args) -> None:
+        # Sin índice cargado no hay nada que mantener: la primera búsqueda lo construirá
+        if self._state is not None:
+            getattr(self._state, operation)(*args)
+        if self._pending is not None:
+            self._pending.append((operation, args))
+
+    def upsert_node(self, node: Any) -> None:
+        self._apply("upsert_node", *_node_fields(node))
+
+    def remove_node(self, name: str) -> None:
+        self._apply("remove_node", name)
+
+    def set_location(self, location_id: Any, location_name: Optional[str]) -> None:
+        self._apply("set_location", str(location_id), location_name)
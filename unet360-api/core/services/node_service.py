@@ -1,5 +1,4 @@
-import asyncio
-from typing import Dict, Optional
+from typing import Dict, Iterable, Optional
 from fastapi import HTTPException
 from bson import ObjectId
 
@@ -7,11 +6,18 @@ from adapter.database.node_repository import NodeRepository
 from adapter.database.tag_repository import TagRepository
 from adapter.database.location_repository import LocationRepository
 
-from core.dtos.node_dto import NodeCreateDTO, NodeUpdateDTO, NodeOutDTO, NodeStatusDTO
+from core.dtos.node_dto import (
+    NodeCreateDTO, NodeUpdateDTO, NodeOutDTO, NodeSearchResultDTO, NodeStatusDTO, NodeSuggestionDTO
+)
 from core.ports.graph_service_port import GraphServicePort
+from core.services.graph_refresh_scheduler import GraphRefreshScheduler
+from core.services.node_search_index import NodeSearchIndex
+from core.services.catalog_cache import CatalogCache
 from core.entities.node_model import Node
 
-from core.mappers.node_mappers import (transform_node_to_node_out_dto, update_db_obj)
+from core.mappers.node_mappers import (
+    transform_node_to_node_out_dto, transform_nodes_to_node_out_dtos, update_db_obj
+)
 
 from core.messages.error_messages import CREATE_ERROR_MESSAGE, OBJECT_NOT_FOUND_ERROR_MESSAGE
 
@@ -24,29 +30,39 @@ class NodeService:
     def __init__(self, repository: NodeRepository,
                  location_repo: LocationRepository,
                  tag_repo: TagRepository,
-                 graph_adapter: GraphServicePort | None = None):
+                 graph_adapter: GraphServicePort | None = None,
+                 refresh_scheduler: GraphRefreshScheduler | None = None):
         self.repository = repository
         self.location_repo = location_repo
         self.tag_repo = tag_repo
         self.graph_adapter = graph_adapter
+        self.refresh_scheduler = refresh_scheduler
+        self.search_index = NodeSearchIndex()
+        self.catalog = CatalogCache()
 
     @property
     def node_repo(self):
         return self.repository
 
+    async def _refresh_graph_for(self, node_names: Iterable[str], wait: bool = False) -> None:
+        # Las escrituras se agrupan en el planificador; opcionalmente se espera a que el grafo las refleje
+        if self.refresh_scheduler is None:
+            return
+        await self.refresh_scheduler.refresh(node_names, wait=wait)
 
-    async def create_node(self, new_node: NodeCreateDTO) -> NodeCreateDTO:
+
+    async def create_node(self, new_node: NodeCreateDTO, wait_for_graph: bool = False) -> NodeCreateDTO:
         location = None
 
         if new_node.location:
-            location = await self.location_repo.get_by_name(new_node.location)
+            location = await self.catalog.get_location(new_node.location)
             if not location:
                 raise HTTPException(status_code=404, detail=OBJECT_NOT_FOUND_ERROR_MESSAGE)
             
         tags_dict = {}
         if new_node.tags:
             for tag_name, tag_values in new_node.tags.items():
-                tag = await self.tag_repo.get_by_name(tag_name)
+                tag = await self.catalog.get_tag(tag_name)
                 if not tag:
                     raise HTTPException(status_code=404, detail=OBJECT_NOT_FOUND_ERROR_MESSAGE)
                 # tag_values expected as Dict[valueName, headingFloat]
@@ -76,11 +92,8 @@ class NodeService:
         if not new_node_db_obj.id:
             raise HTTPException(status_code=500, detail=CREATE_ERROR_MESSAGE)
 
-        if self.graph_adapter is not None:
-            try:
-                asyncio.create_task(self.graph_adapter.refresh_graph())
-            except Exception:
-                pass
+        self.search_index.upsert_node(new_node_db_obj)
+        await self._refresh_graph_for([new_node_db_obj.name], wait=wait_for_graph)
         
         return NodeCreateDTO(
             name=new_node_db_obj.name,
@@ -106,13 +119,13 @@ class NodeService:
 
     async def get_all_nodes(self) -> list[NodeOutDTO]:
         nodes = await self.repository.get_all()
-        return [await transform_node_to_node_out_dto(node) for node in nodes]
+        return await transform_nodes_to_node_out_dtos(nodes)
     
     async def get_paginated_nodes(self, page: int, page_size: int, search: Optional[str] = None) -> dict:
         import math
         skip = (page - 1) * page_size
         nodes, total = await self.repository.get_paginated(skip, page_size, search)
-        nodes_out_dtos = [await transform_node_to_node_out_dto(node) for node in nodes]
+        nodes_out_dtos = await transform_nodes_to_node_out_dtos(nodes)
         total_pages = math.ceil(total / page_size) if page_size > 0 else 0
         return {
             "items": [node_dto.model_dump() for node_dto in nodes_out_dtos],
@@ -124,7 +137,7 @@ class NodeService:
     
     async def get_keyset_nodes(self, page: int, page_size: int, sort: str = "asc", search: Optional[str] = None) -> dict:
         nodes, total = await self.repository.get_keyset_paginated(page, page_size, sort, search)
-        nodes_out_dtos = [await transform_node_to_node_out_dto(node) for node in nodes]
+        nodes_out_dtos = await transform_nodes_to_node_out_dtos(nodes)
         import math
         total_pages = math.ceil(total / page_size) if page_size > 0 else 0
         return {
@@ -138,35 +151,30 @@ class NodeService:
     
 
     async def search_nodes(self, keywords: list[str]) -> list[NodeOutDTO]:
-        all_nodes = await self.repository.get_all()
-        lower_keywords = [k.lower() for k in keywords]
-        
-        matching_nodes = []
-
-        for node in all_nodes:
-            searchable_text = []
-            
-            searchable_text.append(node.name.lower())
-
-            if node.location:
-                location_doc = await node.location.fetch()
-                if location_doc:
-                    searchable_text.append(location_doc.name.lower())
-            if node.tags:
-                for tag_key, tag_value in node.tags.items():
-                    searchable_text.append(tag_key.lower())
-                    if isinstance(tag_value, list):
-                        searchable_text.extend([str(v).lower() for v in tag_value])
-                    elif isinstance(tag_value, dict):
-                        searchable_text.extend([str(k).lower() for k in tag_value.keys()])
-
-            full_searchable_text = " ".join(searchable_text)
-            
-            if all(keyword in full_searchable_text for keyword in lower_keywords):
-                matching_nodes.append(node)
-        return [await transform_node_to_node_out_dto(node) for node in matching_nodes]
-
-    async def update_node(self, name: str, dto: NodeUpdateDTO) -> NodeOutDTO:
+        # Coincidencia por subcadena (sin distinguir mayúsculas) de todas las palabras en el nombre,
+        # la Location o los tags, resuelta en el índice en memoria; solo se leen de BD los nodos encontrados
+        matching_names = await self.search_index.search(keywords)
+        if not matching_names:
+            return []
+        matching_nodes = await self.repository.get_by_names(list(matching_names))
+        return await transform_nodes_to_node_out_dtos(matching_nodes)
+
+    async def fuzzy_search_nodes(self, query: str, limit: int) -> list[NodeSearchResultDTO]:
+        # Ranking por similitud de trigramas en el índice; solo se leen de BD los `limit` mejores
+        ranked = await self.search_index.fuzzy_search(query, limit)
+        if not ranked:
+            return []
+        nodes_by_name = {node.name: node for node in await self.repository.get_by_names([name for name, _ in ranked])}
+        ranked = [(name, score) for name, score in ranked if name in nodes_by_name]
+        dtos = await transform_nodes_to_node_out_dtos([nodes_by_name[name] for name, _ in ranked])
+        return [NodeSearchResultDTO(node=dto, score=round(score, 4)) for dto, (_, score) in zip(dtos, ranked)]
+
+    async def autocomplete(self, prefix: str, limit: int) -> list[NodeSuggestionDTO]:
+        # Se responde solo desde memoria: no hay consultas a BD por pulsación
+        suggestions = await self.search_index.autocomplete(prefix, limit)
+        return [NodeSuggestionDTO(type=kind, text=text, count=count) for kind, text, count in suggestions]
+
+    async def update_node(self, name: str, dto: NodeUpdateDTO, wait_for_graph: bool = False) -> NodeOutDTO:
         node = await self.repository.get_by_name(name)
         if not node:
             raise HTTPException(status_code=404, detail=OBJECT_NOT_FOUND_ERROR_MESSAGE)
@@ -176,7 +184,7 @@ class NodeService:
         if 'tags' in update_data:
             tags_dict = {}
             for tag_name, tag_values in update_data['tags'].items():
-                tag = await self.tag_repo.get_by_name(tag_name)
+                tag = await self.catalog.get_tag(tag_name)
                 if not tag:
                     raise HTTPException(status_code=404, detail=f"Tag '{tag_name}' no encontrado")
                 tags_dict[tag_name] = tag_values
@@ -191,27 +199,25 @@ class NodeService:
         node = await update_db_obj(node_db_obj=node, new_data=update_data)
         updated = await self.repository.update(node)
 
-        # Refrescar grafo si está disponible
-        if self.graph_adapter is not None:
-            try:
-                asyncio.create_task(self.graph_adapter.refresh_graph())
-            except Exception:
-                pass
+        if updated:
+            if updated.name != name:
+                self.search_index.remove_node(name)
+            self.search_index.upsert_node(updated)
+
+        # Refrescar grafo (el nodo con nombre previo y actual)
+        await self._refresh_graph_for({name, node.name}, wait=wait_for_graph)
 
         return await transform_node_to_node_out_dto(updated) if updated else None
     
 
-    async def delete_node(self, name: str):
+    async def delete_node(self, name: str, wait_for_graph: bool = False):
         node = await self.repository.get_by_name(name)
         if not node:
             raise HTTPException(status_code=404, detail=OBJECT_NOT_FOUND_ERROR_MESSAGE)
         await self.repository.delete(node)
-        # Refrescar grafo si está disponible
-        if self.graph_adapter is not None:
-            try:
-                asyncio.create_task(self.graph_adapter.refresh_graph())
-            except Exception:
-                pass
+        self.search_index.remove_node(name)
+        # Refrescar grafo
+        await self._refresh_graph_for([name], wait=wait_for_graph)
         return {"message": "Node deleted"}
 
     async def get_nodes_statuses(self) -> list[NodeStatusDTO]:
@@ -222,7 +228,10 @@ class NodeService:
         graph_names: set[str] = set()
         if hasattr(self, 'graph_adapter') and self.graph_adapter is not None:
             try:
-                await self.graph_adapter.refresh_graph()
+                if self.refresh_scheduler is not None:
+                    await self.refresh_scheduler.refresh(wait=True)
+                else:
+                    await self.graph_adapter.refresh_graph()
                 graph_nodes = await self.graph_adapter.get_all_nodes()
                 graph_names = {gn.name for gn in graph_nodes}
             except Exception:
@@ -290,7 +299,7 @@ class NodeService:
 
         return [compute_status(n) for n in nodes]
 
-    async def fix_asymmetric_weights(self) -> int:
+    async def fix_asymmetric_weights(self, wait_for_graph: bool = False) -> int:
         nodes = await self.repository.get_all()
         node_map = {n.name: n for n in nodes}
         modified_nodes = {}
@@ -328,11 +337,8 @@ class NodeService:
         for node in modified_nodes.values():
             await self.repository.update(node)
             
-        if modified_nodes and self.graph_adapter is not None:
-            try:
-                asyncio.create_task(self.graph_adapter.refresh_graph())
-            except Exception:
-                pass
+        if modified_nodes:
+            await self._refresh_graph_for(modified_nodes.keys(), wait=wait_for_graph)
                 
         return len(modified_nodes)
 
@@ -345,7 +351,7 @@ class NodeService:
         import os
 
         bucket_path = os.getenv("INTERNAL_BUCKET_PATH", "")
-        nodes = await self.repository.get_all()
+        names = [doc["name"] async for doc in self.repository.stream_projection(("name",))]
 
         # Get existing tile folders on disk
         try:
@@ -354,8 +360,8 @@ class NodeService:
             existing_folders = set()
 
         missing = []
-        for node in nodes:
-            if node.name not in existing_folders:
-                missing.append(node.name)
+        for name in names:
+            if name not in existing_folders:
+                missing.append(name)
 
         return missing
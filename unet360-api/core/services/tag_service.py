@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from adapter.database.tag_repository import TagRepository
 from core.dtos.tag_dto import TagCreateDTO, TagUpdateDTO, TagOutDTO
 from core.entities.tag_model import Tag
+from core.services.catalog_cache import CatalogCache
 from core.messages.error_messages import CREATE_ERROR_MESSAGE, OBJECT_NOT_FOUND_ERROR_MESSAGE
 
 
@@ -13,6 +14,7 @@ class TagService:
 
     def __init__(self, repository: TagRepository):
         self.repository = repository
+        self.catalog = CatalogCache()
 
     async def create_tag(self, new_tag: TagCreateDTO) -> TagOutDTO:
         tag_db_obj = Tag(**new_tag.model_dump())
@@ -21,6 +23,7 @@ class TagService:
         if not new_tag_db_obj.id:
             raise HTTPException(status_code=500, detail=CREATE_ERROR_MESSAGE)
 
+        self.catalog.invalidate()
         return TagOutDTO(**new_tag_db_obj.model_dump())
 
     async def get_tag_by_name(self, name: str) -> TagOutDTO | None:
@@ -45,6 +48,7 @@ class TagService:
             setattr(tag, key, value)
 
         updated = await self.repository.update(tag)
+        self.catalog.invalidate()
         return TagOutDTO(**updated.model_dump())
 
     async def delete_tag(self, name: str):
@@ -52,4 +56,5 @@ class TagService:
         if not tag:
             raise HTTPException(status_code=404, detail=OBJECT_NOT_FOUND_ERROR_MESSAGE)
         await self.repository.delete(tag)
+        self.catalog.invalidate()
         return {"message": "Tag deleted"}
\ No newline at end of file